@@ -1,4 +1,5 @@
 import serial
+from sensors.parser import parse_line
 
 # Replace with your actual Arduino port
 arduino_port = 'COM7'
@@ -10,26 +11,22 @@ try:
 
     while True:
         if ser.in_waiting > 0:
-            line = ser.readline().decode('utf-8').strip()
-            print("Raw:", line)
+            line = ser.readline()
+            print("Raw:", line.decode('utf-8', errors='replace').strip())
 
-            try:
-                # Example expected format:
-                # Temp: 25.00 C, Hum: 60.00 %, MQ-3: 400, LDR: 300
-                parts = line.split(',')
-                temperature = float(parts[0].split(':')[1].strip().replace('C', ''))
-                humidity = float(parts[1].split(':')[1].strip().replace('%', ''))
-                mq3_value = int(parts[2].split(':')[1].strip())
-                ldr_value = int(parts[3].split(':')[1].strip())
+            # Example expected format:
+            # Temp: 25.00 C, Hum: 60.00 %, MQ-3: 400, LDR: 300
+            values = parse_line(line)
+            if values is None:
+                print("Error parsing line:", line)
+                continue
+            temperature, humidity, mq3_value, ldr_value = values
 
-                print(f"Temperature: {temperature} °C")
-                print(f"Humidity: {humidity} %")
-                print(f"MQ-3 Value: {mq3_value}")
-                print(f"LDR Value: {ldr_value}")
-                print("-" * 40)
-
-            except (IndexError, ValueError) as e:
-                print("Error parsing line:", e)
+            print(f"Temperature: {temperature} °C")
+            print(f"Humidity: {humidity} %")
+            print(f"MQ-3 Value: {mq3_value}")
+            print(f"LDR Value: {ldr_value}")
+            print("-" * 40)
 
 except serial.SerialException as e:
     print("Error opening serial port:", e)
@@ -0,0 +1,389 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from importlib import metadata
+from urllib.parse import urlencode
+from .synthetic import BUDGETS, DEFAULT_PRICE_FABRICS, OCCASIONS, SEASONS, base_fabric_names, write_catalog
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+DEFAULT_OUTPUT = "benchmark_results.json"
+# Share of lookups for names that are not in the catalog (typos, stale links)
+MISS_RATE = 0.1
+# Metric compared against a baseline run, per result group
+BASELINE_METRICS = {"load": "seconds", "helper": "p50_us", "route": "p50_us", "mixed": "p99_us", "export": "seconds",
+                    "adjust": "p50_us"}
+EXPORT_FORMATS = ("csv", "ndjson")
+# Movements per /stock/adjust batch
+ADJUST_BATCH = 1000
+# Raw feature rows per background recycling batch
+MODEL_BATCH = 16
+
+
+def latency_stats(latencies_ns, seconds):
+    latencies_ns = sorted(latencies_ns)
+    count = len(latencies_ns)
+
+    def percentile(p):
+        return round(latencies_ns[min(count - 1, int(p * count))] / 1000, 1)
+
+    return {
+        "calls": count,
+        "seconds": round(seconds, 4),
+        "per_second": round(count / seconds, 1) if seconds else None,
+        "mean_us": round(sum(latencies_ns) / count / 1000, 1),
+        "p50_us": percentile(0.50),
+        "p95_us": percentile(0.95),
+        "p99_us": percentile(0.99),
+        "max_us": round(latencies_ns[-1] / 1000, 1),
+    }
+
+
+def time_calls(func, inputs):
+    latencies = []
+    started = time.perf_counter()
+    for args in inputs:
+        start = time.perf_counter_ns()
+        func(*args)
+        latencies.append(time.perf_counter_ns() - start)
+    return latency_stats(latencies, time.perf_counter() - started)
+
+
+def load_test(app, urls, concurrency):
+    # Spreads the requests over `concurrency` threads, each with its own
+    # test client (the client is not thread-safe); fails on any non-200
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    work = iter(urls)
+
+    def worker():
+        client = app.test_client()
+        mine = []
+        for url in work:
+            start = time.perf_counter_ns()
+            response = client.get(url)
+            response.get_data()
+            mine.append(time.perf_counter_ns() - start)
+            if response.status_code != 200:
+                errors.append(f"{url}: HTTP {response.status_code}")
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    stats = latency_stats(latencies, time.perf_counter() - started)
+    stats["concurrency"] = concurrency
+    stats["errors"] = len(errors)
+    if errors:
+        print(f"  {len(errors)} failed requests, e.g. {errors[0]}")
+    return stats
+
+
+def model_load(app, rng, stop, concurrency):
+    # Background threads posting recycling batches of raw feature rows (most
+    # of them new to the model) until `stop` is set; returns per-status counts
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(seed):
+        local = random.Random(seed)
+        client = app.test_client()
+        mine = {}
+        while not stop.is_set():
+            items = [{"Biodegradable": local.choice(["Yes", "No"]), "Recyclable": "Yes",
+                      "Monthly_Waste_kg": local.randint(150, 750), "Annual_Trend": local.randint(-5, 10)}
+                     for _ in range(MODEL_BATCH)]
+            response = client.post("/get_recycling_info/batch", json={"items": items})
+            response.get_data()
+            mine[response.status_code] = mine.get(response.status_code, 0) + 1
+        with lock:
+            for status, count in mine.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(rng.random(),), daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    return threads, statuses
+
+
+def sample_names(rng, names, count):
+    return [rng.choice(names) if rng.random() >= MISS_RATE else f"unknown fabric {i}" for i in range(count)]
+
+
+def search_queries(rng, names, count):
+    # A third each: misspelt names (one character dropped), prefixes, whole names
+    queries = []
+    for name in (rng.choice(names) for _ in range(count)):
+        kind = rng.randrange(3)
+        if kind == 0:
+            i = rng.randrange(len(name))
+            name = name[:i] + name[i + 1:]
+        elif kind == 1:
+            name = name[:rng.randint(1, min(6, len(name)))]
+        queries.append(name)
+    return queries
+
+
+def helper_inputs(rng, catalog, count):
+    combos = [(rng.choice(SEASONS), rng.choice(OCCASIONS), rng.choice(BUDGETS)) for _ in range(count)]
+    return {
+        "get_stock_details": [(name,) for name in sample_names(rng, catalog["stock"], count)],
+        "predict_price": [(name,) for name in sample_names(rng, catalog["priced"], count)],
+        "recommend_fabrics": combos,
+        "get_recycling_steps": [(name,) for name in sample_names(rng, catalog["stock"], count)],
+        "get_inventory_summary": [()] * count,
+        "search_fabrics": [(query,) for query in search_queries(rng, catalog["stock"], count)],
+    }
+
+
+def route_urls(rng, catalog, count):
+    def urls(path, field, names):
+        return [f"{path}?{urlencode({field: name})}" for name in sample_names(rng, names, count)]
+
+    return {
+        "/check_stock": urls("/check_stock", "fabric_type", catalog["stock"]),
+        "/predict_price": urls("/predict_price", "fabric_type", catalog["priced"]),
+        "/recommend_fabrics": [
+            "/recommend_fabrics?" + urlencode({"season": rng.choice(SEASONS), "occasion": rng.choice(OCCASIONS),
+                                               "budget": rng.choice(BUDGETS)})
+            for _ in range(count)
+        ],
+        "/get_recycling_info": urls("/get_recycling_info", "fabric_name", catalog["stock"]),
+        "/search": [f"/search?{urlencode({'q': query})}" for query in search_queries(rng, catalog["stock"], count)],
+        "/export/inventory": [
+            "/export/inventory?" + urlencode({"format": "ndjson", "limit": 1000, "min_stock": rng.randrange(500)})
+            for _ in range(max(1, count // 10))
+        ],
+        "/": ["/"] * max(1, count // 10),
+    }
+
+
+def export_run(app, url):
+    # Streams one export to the end without keeping it: (seconds, bytes, rows)
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    size = lines = 0
+    for chunk in response.response:
+        size += len(chunk)
+        lines += chunk.count(b"\n")
+    response.close()
+    if response.status_code != 200:
+        raise RuntimeError(f"{url}: HTTP {response.status_code}")
+    return time.perf_counter() - started, size, lines
+
+
+def export_stats(app, url):
+    # A timed run, then a traced one for the peak Python memory the stream needed
+    seconds, size, lines = export_run(app, url)
+    tracemalloc.start()
+    try:
+        export_run(app, url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(seconds, 4), "mb": round(size / (1 << 20), 1), "rows_per_second": round(lines / seconds),
+            "peak_traced_mb": round(peak / (1 << 20), 1)}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def run_size(dashboard, rows, args, workdir):
+    print(f"== {rows} rows")
+    rng = random.Random(args.seed)
+    results = []
+
+    started = time.perf_counter()
+    catalog = write_catalog(workdir, rows, args.price_fabrics, args.seed, args.model_file, args.base)
+    print(f"  generated in {time.perf_counter() - started:.2f}s")
+
+    report = dashboard.engine.reload(reason=f"benchmark {rows} rows", full=True)
+    if not report["ok"]:
+        raise RuntimeError(f"Loading the {rows}-row catalog failed: {report['error']}")
+    for phase, seconds in report["timings"].items():
+        results.append({"rows": rows, "group": "load", "name": phase, "seconds": seconds})
+    results[-1]["peak_rss_mb"] = peak_rss_mb()
+    print(f"  loaded in {report['timings']['total']:.2f}s ({report['timings']})")
+
+    for name, inputs in helper_inputs(rng, catalog, args.calls).items():
+        stats = time_calls(getattr(dashboard, name), inputs)
+        results.append(dict({"rows": rows, "group": "helper", "name": name}, **stats))
+        print(f"  {name:<24} p50 {stats['p50_us']:>9} us  p99 {stats['p99_us']:>9} us")
+
+    for path, urls in route_urls(rng, catalog, args.requests).items():
+        dashboard.response_cache.clear()
+        before = dashboard.response_cache.stats()
+        stats = load_test(dashboard.app, urls, args.concurrency)
+        after = dashboard.response_cache.stats()
+        stats["cache_hits"] = after["hits"] - before["hits"]
+        results.append(dict({"rows": rows, "group": "route", "name": path}, **stats))
+        print(f"  GET {path:<20} {stats['per_second']:>8} req/s  p50 {stats['p50_us']:>9} us  "
+              f"p99 {stats['p99_us']:>9} us")
+
+    # Whole-catalog exports: time, size and the memory the stream needed
+    for fmt in EXPORT_FORMATS:
+        stats = export_stats(dashboard.app, f"/export/inventory?format={fmt}")
+        results.append(dict({"rows": rows, "group": "export", "name": f"inventory.{fmt}"}, **stats))
+        print(f"  export inventory.{fmt:<8} {stats['seconds']:>8}s  {stats['mb']:>7} MB  "
+              f"{stats['rows_per_second']:>9} rows/s  peak {stats['peak_traced_mb']} MB traced")
+
+    # Receipts in batches through /stock/adjust, then one compaction of them into the stock CSV
+    client = dashboard.app.test_client()
+    batches = [[[name, rng.randint(1, 50)] for name in rng.choices(catalog["stock"], k=ADJUST_BATCH)]
+               for _ in range(max(1, args.requests // 20))]
+    latencies = []
+    started = time.perf_counter()
+    for movements in batches:
+        start = time.perf_counter_ns()
+        response = client.post("/stock/adjust", json={"movements": movements})
+        latencies.append(time.perf_counter_ns() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"/stock/adjust: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+    stats = dict(latency_stats(latencies, time.perf_counter() - started), movements=ADJUST_BATCH)
+    results.append(dict({"rows": rows, "group": "adjust", "name": "/stock/adjust"}, **stats))
+    compaction = dashboard.stock_ledger.compact()
+    results.append({"rows": rows, "group": "adjust", "name": "compact", "seconds": compaction["seconds"]})
+    print(f"  POST /stock/adjust ({ADJUST_BATCH} movements) p50 {stats['p50_us']:>9} us  p99 {stats['p99_us']:>9} us, "
+          f"compaction {compaction['seconds']}s")
+
+    # The cheap endpoints again, idle and then while the recycling model is flooded
+    probes = {
+        "/get_arduino_data": ["/get_arduino_data"] * args.requests,
+        "/check_stock": route_urls(rng, catalog, args.requests)["/check_stock"],
+    }
+    for path, urls in probes.items():
+        dashboard.response_cache.clear()
+        idle = load_test(dashboard.app, urls, 2)
+        dashboard.response_cache.clear()
+        stop = threading.Event()
+        threads, statuses = model_load(dashboard.app, rng, stop, args.concurrency)
+        try:
+            stats = load_test(dashboard.app, urls, 2)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        stats["idle_p99_us"] = idle["p99_us"]
+        stats["model_requests"] = {str(status): count for status, count in sorted(statuses.items())}
+        results.append(dict({"rows": rows, "group": "mixed", "name": path}, **stats))
+        print(f"  GET {path:<20} under model load: p99 {stats['p99_us']:>9} us (idle {idle['p99_us']} us), "
+              f"model requests {stats['model_requests']}")
+    return results
+
+
+def environment():
+    import numpy
+    import pandas
+    import sklearn
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "flask": metadata.version("flask"),
+        "commit": commit,
+    }
+
+
+def compare(results, baseline_file, threshold):
+    # Prints every metric that got slower than `threshold` times the
+    # baseline; returns how many did
+    with open(baseline_file) as f:
+        baseline = {(r["rows"], r["group"], r["name"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        old = baseline.get((result["rows"], result["group"], result["name"]))
+        metric = BASELINE_METRICS[result["group"]]
+        if not old or not old.get(metric) or result.get(metric) is None:
+            continue
+        ratio = result[metric] / old[metric]
+        if ratio > threshold:
+            regressions += 1
+            print(f"REGRESSION {result['rows']:>8} {result['group']:<6} {result['name']:<24} "
+                  f"{metric} {old[metric]} -> {result[metric]} ({ratio:.2f}x)")
+    print(f"{regressions} regression(s) against {baseline_file} (threshold {threshold:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the inventory helpers and the ss.py routes on synthetic catalogs.")
+    parser.add_argument("--rows", default=DEFAULT_SIZES, help="comma-separated catalog sizes")
+    parser.add_argument("--calls", type=int, default=2000, help="direct calls per helper")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads for the route load test")
+    parser.add_argument("--price-fabrics", type=int, default=DEFAULT_PRICE_FABRICS,
+                        help="distinct fabrics in the demand table (one price model each)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON results file")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.rows.split(",") if size.strip()]
+
+    # Run from the project directory, like the apps. The catalogs are
+    # written to a scratch directory that becomes the working directory, so
+    # the dashboard loads them (and keeps its databases) there.
+    project_dir = os.getcwd()
+    args.model_file = os.path.join(project_dir, "fabric_recycling_model.pkl")
+    args.base = base_fabric_names()
+    args.output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    meta = dict(environment(), created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                args={k: v for k, v in vars(args).items() if k not in ("model_file", "base")})
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="inventory_bench_") as workdir:
+        sys.path.insert(0, project_dir)
+        os.chdir(workdir)
+        try:
+            write_catalog(workdir, sizes[0], args.price_fabrics, args.seed, args.model_file, args.base)
+            # No serial boards, and no background reloads while measuring
+            os.environ["ARDUINO_PORTS"] = ""
+            dashboard = importlib.import_module("ss")
+            dashboard.engine.stop_watcher()
+            for rows in sizes:
+                results.extend(run_size(dashboard, rows, args, workdir))
+            dashboard.serial_ingestor.stop(timeout=1)
+            dashboard.sensor_store.stop()
+            dashboard.stock_ledger.stop()
+        finally:
+            os.chdir(project_dir)
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    if baseline and compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import random
+import time
+from sensors.parser import FrameReader, encode_binary_frame, parse_line
+
+
+def split_parse(line):
+    # The original parser from ss.py/app3.py, kept as the baseline
+    line = line.decode('utf-8', errors='replace').strip()
+    try:
+        parts = line.split(',')
+        if len(parts) >= 4:
+            temperature = float(parts[0].split(':')[1].strip().replace('C', ''))
+            humidity = float(parts[1].split(':')[1].strip().replace('%', ''))
+            mq3_value = int(parts[2].split(':')[1].strip())
+            ldr_value = int(parts[3].split(':')[1].strip())
+            return temperature, humidity, mq3_value, ldr_value
+    except (IndexError, ValueError):
+        pass
+    return None
+
+
+def make_readings(count):
+    rng = random.Random(0)
+    return [(round(rng.uniform(15, 40), 2), round(rng.uniform(20, 90), 2), rng.randint(0, 1023), rng.randint(0, 1023))
+            for _ in range(count)]
+
+
+def bench(name, func, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(items)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28} {len(items) / best / 1e6:8.2f} M lines/s  ({best / len(items) * 1e9:7.0f} ns/line)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial line parsers.")
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    readings = make_readings(args.lines)
+    text = [f"Temp: {t:.2f} C, Hum: {h:.2f} %, MQ-3: {m}, LDR: {l}\r\n".encode() for t, h, m, l in readings]
+    csv_lines = [f"{t:.2f},{h:.2f},{m},{l}\r\n".encode() for t, h, m, l in readings]
+    text_stream = b"".join(text)
+    binary_stream = b"".join(encode_binary_frame(*reading) for reading in readings)
+    assert all(split_parse(line) == parse_line(line) for line in text[:1000])
+
+    print(f"{args.lines} readings, best of {args.repeat}")
+    bench("split (old, text)", lambda lines: [split_parse(line) for line in lines], text, args.repeat)
+    bench("translate (text)", lambda lines: [parse_line(line) for line in lines], text, args.repeat)
+    bench("translate (csv)", lambda lines: [parse_line(line) for line in lines], csv_lines, args.repeat)
+    # Whole-stream reads as the ingestor sees them, including frame splitting
+    bench("FrameReader (text stream)", lambda _: FrameReader().feed(text_stream), text, args.repeat)
+    bench("FrameReader (binary stream)", lambda _: FrameReader().feed(binary_stream), text, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
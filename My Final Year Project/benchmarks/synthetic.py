@@ -0,0 +1,98 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from inventory_engine.data_loader import DEMAND_FILE, STOCK_FILE, WASTE_FILE
+from inventory_engine.recycling_model import MODEL_FILE
+
+# Label sets the apps and the saved recycling model understand
+SEASONS = ["Summer", "All-Season", "Winter", "Rainy"]
+OCCASIONS = ["Casual", "Ethnic", "Formal", "Sportswear", "Workwear"]
+BUDGETS = ["Low", "Medium", "High"]
+UNIT_TYPES = ["Rolls", "Meters", "Kilograms"]
+DISPOSAL_METHODS = ["Composting", "Mechanical Recycling", "Chemical Recycling", "Incineration"]
+
+# Distinct fabrics in the demand table. Every fabric gets its own price
+# regression at load time, so this (not the row count) sets the fit cost;
+# bigger catalogs repeat these fabrics across seasons and occasions.
+DEFAULT_PRICE_FABRICS = 2000
+
+
+def base_fabric_names(demand_file=DEMAND_FILE):
+    # Real fabric names first, so market overrides and the sample queries
+    # behave as they do on the shipped data
+    names = pd.read_csv(demand_file, usecols=[1]).iloc[:, 0].str.strip().str.lower()
+    return list(dict.fromkeys(names))
+
+
+def fabric_names(count, base):
+    # "cotton", "silk", ..., then "cotton 1", "silk 1", ...
+    names = []
+    for i in range(count):
+        round_, position = divmod(i, len(base))
+        names.append(base[position] if round_ == 0 else f"{base[position]} {round_}")
+    return names
+
+
+def make_catalog(rows, price_fabrics=DEFAULT_PRICE_FABRICS, seed=0, base=None):
+    # Returns (stock_df, demand_df, waste_df) with `rows` rows each, using the
+    # raw column headers of the shipped CSVs. Stock and waste rows are one
+    # fabric each; demand rows cycle over min(rows, price_fabrics) fabrics.
+    rng = np.random.default_rng(seed)
+    names = np.asarray(fabric_names(rows, base or base_fabric_names()), dtype=object)
+    ids = np.arange(1, rows + 1)
+
+    stock = pd.DataFrame({
+        "ID": ids,
+        "\tFabric Type": names,
+        "\tStock Available": rng.integers(0, 500, rows),
+        "\tPrice per Unit": rng.integers(50, 1000, rows),
+        "Unit Type": rng.choice(UNIT_TYPES, rows),
+    })
+
+    historical = rng.integers(50, 300, rows)
+    current = np.round(historical * rng.uniform(0.6, 1.5, rows)).astype(np.int64)
+    demand = pd.DataFrame({
+        "ID": ids,
+        "Fabric Type": names[np.arange(rows) % min(rows, price_fabrics)],
+        "Historical Demand": historical,
+        "Current Demand": current,
+        "Future Demand": np.round(current * rng.uniform(0.8, 1.3, rows)).astype(np.int64),
+        "Price per Unit": rng.integers(50, 1000, rows),
+        "Unit Type": rng.choice(UNIT_TYPES, rows),
+        " Season": rng.choice(SEASONS, rows),
+        " Occasion": rng.choice(OCCASIONS, rows),
+        " Budget Category": rng.choice(BUDGETS, rows),
+    })
+
+    biodegradable = rng.random(rows) < 0.5
+    waste = pd.DataFrame({
+        "Fabric": names,
+        "Biodegradable": np.where(biodegradable, "Yes", "No"),
+        "Recyclable": "Yes",
+        "Monthly_Waste_kg": rng.integers(150, 750, rows),
+        "Annual_Trend": rng.integers(-5, 10, rows),
+        "Disposal Method": np.where(biodegradable, "Composting", rng.choice(DISPOSAL_METHODS[1:], rows)),
+        "Recycling Efficiency (%)": rng.integers(28, 92, rows),
+    })
+    return stock, demand, waste
+
+
+def write_catalog(directory, rows, price_fabrics=DEFAULT_PRICE_FABRICS, seed=0, model_file=MODEL_FILE,
+                  base=None):
+    # Writes a synthetic catalog under the file names the apps load by
+    # default, plus a copy of the trained recycling model (retraining it on
+    # a million rows would dominate the run). Returns the fabric names.
+    base = base or base_fabric_names()
+    stock, demand, waste = make_catalog(rows, price_fabrics, seed, base)
+    os.makedirs(directory, exist_ok=True)
+    stock.to_csv(os.path.join(directory, STOCK_FILE), index=False)
+    demand.to_csv(os.path.join(directory, DEMAND_FILE), index=False)
+    waste.to_csv(os.path.join(directory, WASTE_FILE), index=False)
+    target = os.path.join(directory, MODEL_FILE)
+    if os.path.exists(model_file) and os.path.abspath(model_file) != os.path.abspath(target):
+        shutil.copyfile(model_file, target)
+    return {
+        "stock": list(stock["\tFabric Type"]),
+        "priced": list(dict.fromkeys(demand["Fabric Type"])),
+    }
@@ -0,0 +1,17 @@
+from .data_loader import load_dataset, load_demand, load_stock, load_waste
+from .engine import (InventoryEngine, InventorySnapshot, build_recycling_steps, demand_status, demand_statuses,
+                     get_engine)
+from .export import EXPORT_FORMATS, INVENTORY_COLUMNS, decode_cursor, encode_cursor, record_frames, stream_export
+from .fabric_index import FabricIndex, normalize_fabric_name
+from .fabric_search import FabricSearch
+from .forecast import compute_forecasts, forecast_page, forecast_status
+from .inventory_summary import InventorySummary
+from .metrics import MetricsRegistry, SlowRequestProfiler, instrument_app, metrics_response, profiler_from_env
+from .model_pool import ModelPool, ModelPoolBusy, ModelPoolTimeout
+from .price_models import PriceModel, PriceModelRegistry
+from .recommendations import RecommendationTable
+from .recycling_model import RecyclingModel, load_recycling_model
+from .reorder import compute_reorder_plan, reorder_status, reorder_suggestions
+from .response_cache import ResponseCache, cached_response
+from .restock_queue import RestockQueue, RestockValidationError
+from .stock_ledger import StockAdjustmentError, StockLedger
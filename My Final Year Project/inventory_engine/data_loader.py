@@ -0,0 +1,154 @@
+import hashlib
+import os
+import pickle
+import time
+import pandas as pd
+from .metrics import DATASET_LOAD_SECONDS, observe
+
+STOCK_FILE = "textile_stock_dataset.csv"
+DEMAND_FILE = "textile_demand_dataset.csv"
+WASTE_FILE = "Fabric_Waste_Data.csv"
+CACHE_DIR = ".dataset_cache"
+
+# Bump when the cleaning rules below change so old snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+# Per dataset: column dtypes (after header cleanup), low-cardinality columns
+# stored as categoricals, and columns normalized to lowercase lookup keys.
+# Fabric names stay plain strings: they are near-unique, so a categorical
+# would not save memory, and the FabricIndex already handles lookups.
+DATASETS = {
+    "stock": {
+        "dtypes": {"ID": "int64", "Fabric Type": "str", "Stock Available": "int64",
+                   "Price per Unit": "int64", "Unit Type": "str"},
+        "categories": ["Unit Type"],
+        "lowercase": ["Fabric Type"],
+    },
+    "demand": {
+        "dtypes": {"ID": "int64", "Fabric Type": "str", "Historical Demand": "int64",
+                   "Current Demand": "int64", "Future Demand": "int64", "Price per Unit": "int64",
+                   "Unit Type": "str", "Season": "str", "Occasion": "str", "Budget Category": "str"},
+        "categories": ["Unit Type", "Season", "Occasion", "Budget Category"],
+        "lowercase": ["Fabric Type"],
+    },
+    "waste": {
+        "dtypes": {"Fabric": "str", "Biodegradable": "str", "Recyclable": "str",
+                   "Monthly_Waste_kg": "int64", "Annual_Trend": "int64", "Disposal Method": "str",
+                   "Recycling Efficiency (%)": "int64"},
+        "categories": [],
+        "lowercase": ["Fabric"],
+    },
+}
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_dataset(path, kind):
+    # Reads a CSV with explicit dtypes and cleans it column-wise: headers and
+    # string values are stripped of the tabs/spaces the exports contain
+    spec = DATASETS[kind]
+    header = pd.read_csv(path, nrows=0).columns
+    raw_names = {name.strip(): name for name in header}
+    dtypes = {raw_names[name]: dtype for name, dtype in spec["dtypes"].items() if name in raw_names}
+    try:
+        df = pd.read_csv(path, dtype=dtypes)
+    except (ValueError, TypeError):
+        # A malformed numeric cell; fall back to inferred dtypes
+        df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].str.strip()
+    for column in spec["lowercase"]:
+        df[column] = df[column].str.lower()
+    for column in spec["categories"]:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def _snapshot_path(path, cache_dir):
+    name = os.path.basename(path)
+    return os.path.join(cache_dir, f"{name}.v{SNAPSHOT_VERSION}.pkl")
+
+
+def _read_snapshot(snapshot_path):
+    try:
+        with open(snapshot_path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def _write_snapshot(snapshot_path, snapshot):
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    tmp_path = f"{snapshot_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+
+
+def load_dataset(path, kind, cache_dir=CACHE_DIR):
+    # Returns the cleaned DataFrame for a CSV, reusing a pickled snapshot
+    # when the file is unchanged. Unchanged mtime and size skip even hashing;
+    # a touched but identical file is recognized by its SHA-256.
+    started = time.perf_counter()
+    frame, source = _load_dataset(path, kind, cache_dir)
+    observe(DATASET_LOAD_SECONDS, time.perf_counter() - started, kind, source)
+    return frame
+
+
+def _load_dataset(path, kind, cache_dir):
+    # Returns (frame, "csv" or "snapshot")
+    if cache_dir is None:
+        return parse_dataset(path, kind), "csv"
+    stat = os.stat(path)
+    snapshot_path = _snapshot_path(path, cache_dir)
+    snapshot = _read_snapshot(snapshot_path)
+    if snapshot is not None and snapshot["kind"] == kind:
+        if snapshot["mtime_ns"] == stat.st_mtime_ns and snapshot["size"] == stat.st_size:
+            return snapshot["frame"], "snapshot"
+        digest = _file_digest(path)
+        if snapshot["sha256"] == digest:
+            snapshot.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            _try_write_snapshot(snapshot_path, snapshot)
+            return snapshot["frame"], "snapshot"
+    else:
+        digest = _file_digest(path)
+
+    frame = parse_dataset(path, kind)
+    _try_write_snapshot(snapshot_path, {
+        "kind": kind,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+        "frame": frame,
+    })
+    return frame, "csv"
+
+
+def _try_write_snapshot(snapshot_path, snapshot):
+    # The cache is an optimization; a read-only checkout still works
+    try:
+        _write_snapshot(snapshot_path, snapshot)
+    except OSError as e:
+        print(f"Could not write dataset snapshot {snapshot_path}: {e}")
+
+
+def load_stock(path=STOCK_FILE, cache_dir=CACHE_DIR):
+    return load_dataset(path, "stock", cache_dir)
+
+
+def load_demand(path=DEMAND_FILE, cache_dir=CACHE_DIR):
+    return load_dataset(path, "demand", cache_dir)
+
+
+def load_waste(path=WASTE_FILE, cache_dir=CACHE_DIR):
+    return load_dataset(path, "waste", cache_dir)
@@ -0,0 +1,564 @@
+import copy
+import gc
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from .data_loader import DEMAND_FILE, STOCK_FILE, WASTE_FILE, load_demand, load_stock, load_waste
+from .export import CHUNK_ROWS, inventory_export, price_table
+from .fabric_index import FabricIndex, normalize_fabric_name
+from .fabric_search import DEFAULT_LIMIT, FabricSearch
+from .forecast import compute_forecasts, forecast_page, forecast_status
+from .inventory_summary import LOW_STOCK_THRESHOLD, InventorySummary
+from .metrics import OPERATION_SECONDS, RELOADS, SNAPSHOT_BUILD_SECONDS, observe, timed
+from .price_models import PriceModelRegistry
+from .recommendations import RecommendationTable
+from .recycling_model import MODEL_FILE, load_recycling_model
+from .reorder import compute_reorder_plan, reorder_status, reorder_suggestions, update_reorder_plan
+
+# Fabrics whose demand is known from the Indian market, regardless of the ratio test
+INDIA_HIGH_DEMAND = frozenset({"cotton", "silk", "denim", "polyester"})
+INDIA_LOW_DEMAND = frozenset({"wool", "linen", "rayon"})
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+class InventorySnapshot:
+    # One consistent, fully built set of datasets, lookup indexes and models.
+    # A snapshot is never modified by a reload; the engine builds a new one
+    # and swaps it in. Given the previous snapshot, parts whose source files
+    # are unchanged are reused instead of rebuilt.
+    def __init__(self, stock_file=STOCK_FILE, demand_file=DEMAND_FILE, waste_file=WASTE_FILE,
+                 model_file=MODEL_FILE, low_stock_threshold=LOW_STOCK_THRESHOLD, model_pool=None, previous=None,
+                 stock_deltas=None, stock_seq=0):
+        self.stock_file = stock_file
+        self.demand_file = demand_file
+        self.waste_file = waste_file
+        self.model_file = model_file
+        # Optional ModelPool that recycling inference runs on (see classify_recycling)
+        self.model_pool = model_pool
+        # Last stock ledger movement reflected in stock_df (see with_stock_deltas)
+        self.stock_seq = stock_seq
+        self._stock_rows = None
+        self.loaded_at = time.time()
+        # Stamped before reading, so a file that changes while loading triggers another reload
+        self.file_stamps = _file_stamps([stock_file, demand_file, waste_file, model_file])
+        self.source_version = _source_version(self.file_stamps)
+
+        def unchanged(*paths):
+            return previous is not None and all(
+                self.file_stamps[path] is not None and previous.file_stamps.get(path) == self.file_stamps[path]
+                for path in paths
+            )
+
+        clock = _Stopwatch()
+        self.reused = []
+        if unchanged(stock_file):
+            self.stock_df = previous.stock_df
+            self.stock_index = previous.stock_index
+            self.reused.append("stock")
+        else:
+            self.stock_df = load_stock(stock_file)
+            if stock_deltas:
+                # Logged movements the stock file does not contain yet
+                self.stock_df = _apply_stock_deltas(self.stock_df, self.stock_rows(), stock_deltas)[0]
+            self.stock_index = FabricIndex(self.stock_df, "Fabric Type")
+        clock.lap("stock")
+
+        if unchanged(demand_file):
+            self.demand_df = previous.demand_df
+            self.recommendation_table = previous.recommendation_table
+            self.price_models = previous.price_models
+            self.forecasts = previous.forecasts
+            self.price_table = previous.price_table
+            self.reused.append("demand")
+        else:
+            self.demand_df = load_demand(demand_file)
+            self.recommendation_table = RecommendationTable(self.demand_df)
+            self.price_models = PriceModelRegistry(self.demand_df)
+            # Whole-catalog forecasts, served as computed here
+            self.forecasts = compute_forecasts(self.demand_df)
+            # Per-fabric demand figures and predictions joined onto stock rows by the exports
+            self.price_table = price_table(self.demand_df, self.price_models)
+            self.price_table["demand_status"] = demand_statuses(
+                self.price_table.index, self.price_table["historical_demand"], self.price_table["current_demand"])
+        clock.lap("demand")
+
+        if unchanged(waste_file, model_file):
+            self.fabric_data = previous.fabric_data
+            self.recycling_model = previous.recycling_model
+            self.waste_index = previous.waste_index
+            self.reused.append("recycling")
+        else:
+            self.fabric_data = load_waste(waste_file)
+            # Load the persisted recycling model (see train_recycling_model.py)
+            self.recycling_model = load_recycling_model(model_file, self.fabric_data)
+            self.recycling_model.encode(self.fabric_data)
+            self.waste_index = FabricIndex(self.fabric_data, "Fabric")
+        clock.lap("recycling")
+
+        # Fuzzy name search over all three datasets; only the names matter
+        self.search_names = {
+            "stock": self.stock_index.names(),
+            "demand": self.price_models.names(),
+            "waste": self.waste_index.names(),
+        }
+        if previous is not None and previous.search_names == self.search_names:
+            self.fabric_search = previous.fabric_search
+            self.reused.append("search")
+        else:
+            self.fabric_search = FabricSearch(self.search_names)
+        clock.lap("search")
+
+        # Stock and demand are joined here, so these are always rebuilt (both are cheap)
+        self.inventory_summary = InventorySummary(self.stock_df, self.demand_df, low_stock_threshold)
+        self.refresh_reorder_plan()
+        clock.lap("summaries")
+        self.timings = clock.laps
+        for phase, seconds in self.timings.items():
+            observe(SNAPSHOT_BUILD_SECONDS, seconds, phase)
+
+    def data_version(self):
+        # Changes whenever a response computed from this snapshot could change
+        return f"{self.source_version}-{self.stock_seq}"
+
+    def stock_rows(self):
+        # Normalized fabric name -> position of its first stock row, the row
+        # stock_details() reports and stock movements change. Built on first
+        # use and shared by the adjusted copies, whose names are the same.
+        if self._stock_rows is None:
+            self._stock_rows = _first_rows(self.stock_df)
+        return self._stock_rows
+
+    def with_stock_deltas(self, deltas, seq):
+        # A copy of this snapshot with {fabric: change} added to each fabric's
+        # stock, up to stock ledger movement `seq`. Only what depends on stock
+        # levels changes, in proportion to the batch: the stock column is
+        # copied, the index gets the new records on top of the shared ones,
+        # and the reorder plan recomputes its stock columns. The running
+        # inventory summary is shared and updated in place (it is built for
+        # exactly that), so a request still on this snapshot may see it move.
+        stock_df, names, positions, levels = _apply_stock_deltas(self.stock_df, self.stock_rows(), deltas)
+        fabric_types = stock_df["Fabric Type"].iloc[positions].to_numpy()
+        levels = levels.tolist()
+        snapshot = copy.copy(self)
+        snapshot.stock_df = stock_df
+        snapshot.stock_seq = seq
+        snapshot.stock_index = self.stock_index.updated({
+            name: dict(self.stock_index.get(name), **{"Stock Available": level}) for name, level in zip(names, levels)
+        })
+        self.inventory_summary.set_stock_many(zip(stock_df.index[positions], fabric_types, levels))
+        snapshot.reorder_plan = update_reorder_plan(self.reorder_plan, fabric_types, levels)
+        return snapshot
+
+    def with_file_stamps(self, file_stamps):
+        # A copy that counts as having loaded files with these stamps, for a
+        # file rewritten with exactly the data this snapshot holds
+        snapshot = copy.copy(self)
+        snapshot.file_stamps = dict(self.file_stamps, **file_stamps)
+        snapshot.source_version = _source_version(snapshot.file_stamps)
+        return snapshot
+
+    def refresh_reorder_plan(self):
+        # Cheap enough (one vectorized pass) to call after every stock change
+        self.reorder_plan = compute_reorder_plan(self.stock_df, self.demand_df)
+        return self.reorder_plan
+
+    @timed(OPERATION_SECONDS, "search")
+    def search(self, query, limit=DEFAULT_LIMIT, source=None):
+        return self.fabric_search.search(query, limit, source)
+
+    def match_fabric(self, fabric_name, source):
+        # The closest fabric name in one dataset ("stock", "demand" or
+        # "waste") for a name that has no exact match, or None
+        if not fabric_name or not str(fabric_name).strip():
+            return None
+        return self.fabric_search.best_match(fabric_name, source)
+
+    @timed(OPERATION_SECONDS, "stock_details")
+    def stock_details(self, fabric_type, fuzzy=False):
+        # With fuzzy=True an unknown name falls back to its closest match,
+        # reported as "matched_fabric"
+        stock_info = self.stock_index.get(normalize_fabric_name(fabric_type))
+        matched = None
+        if stock_info is None and fuzzy:
+            matched = self.match_fabric(fabric_type, "stock")
+            stock_info = self.stock_index.get(matched) if matched else None
+        if stock_info is None:
+            return None
+        details = {key: stock_info[key] for key in ["Price per Unit", "Stock Available", "Unit Type"]}
+        if matched:
+            details["matched_fabric"] = matched
+        return details
+
+    @timed(OPERATION_SECONDS, "predict_price")
+    def predict_price(self, fabric_type, market_overrides=True, fuzzy=False):
+        # Returns the predicted price and demand status for a fabric, or None
+        # (also for a missing or blank name, which must not match "none")
+        if fabric_type is None or not str(fabric_type).strip():
+            return None
+        fabric_type = normalize_fabric_name(fabric_type)
+        model = self.price_models.get(fabric_type)
+        matched = None
+        if model is None and fuzzy:
+            matched = self.match_fabric(fabric_type, "demand")
+            model = self.price_models.get(matched) if matched else None
+        if model is None:
+            return None
+        historical_demand, current_demand = model.features
+        prediction = {
+            "predicted_price": round(model.predict(), 2),
+            "demand_status": demand_status(matched or fabric_type, historical_demand, current_demand,
+                                           market_overrides),
+        }
+        if matched:
+            prediction["matched_fabric"] = matched
+        return prediction
+
+    def forecast(self, fabric_type):
+        return forecast_status(self.forecasts, normalize_fabric_name(fabric_type))
+
+    def forecast_page(self, status=None, limit=None, offset=0):
+        return forecast_page(self.forecasts, status, limit, offset)
+
+    def reorder_suggestions(self, limit=None):
+        return reorder_suggestions(self.reorder_plan, limit)
+
+    def reorder_status(self, fabric_type):
+        return reorder_status(self.reorder_plan, normalize_fabric_name(fabric_type))
+
+    def export_inventory(self, after=None, limit=None, chunk_rows=CHUNK_ROWS, **filters):
+        # (next page key, frames) of the stock + demand + predicted price
+        # view; the frames read this snapshot even if a reload swaps it out
+        return inventory_export(self.stock_df, self.price_table, after, limit, chunk_rows,
+                                self.inventory_summary.low_stock_threshold, **filters)
+
+    @timed(OPERATION_SECONDS, "recommend_fabrics")
+    def recommend_fabrics(self, season, occasion, budget, fallback=True):
+        return self.recommendation_table.lookup(season, occasion, budget, fallback)
+
+    @timed(OPERATION_SECONDS, "classify_recycling")
+    def classify_recycling(self, items, fuzzy=False):
+        # Memoized rows are answered on the calling thread; the rest may raise
+        # ModelPoolBusy or ModelPoolTimeout when a pool is configured. With
+        # fuzzy=True unknown names are classified as their closest match,
+        # reported as "matched_fabric".
+        matches = {}
+        if fuzzy:
+            for item in items:
+                if isinstance(item, str) and item not in matches and item not in self.waste_index:
+                    matches[item] = self.match_fabric(item, "waste")
+        resolved = [matches.get(item) or item if isinstance(item, str) else item for item in items]
+        results = self.recycling_model.classify(resolved, self.waste_index, self.model_pool)
+        for item, result in zip(items, results):
+            if isinstance(item, str) and matches.get(item) and "error" not in result:
+                result["input"] = item
+                result["matched_fabric"] = result["fabric"]
+        return results
+
+    def recycling_steps(self, fabric_name, detailed=True, fuzzy=False):
+        # Returns the step list for one fabric, or None when it is unknown
+        result = self.classify_recycling([fabric_name], fuzzy)[0]
+        if "error" in result:
+            return None
+        return build_recycling_steps(result["fabric"], result["biodegradable"], result["disposal_method"], detailed)
+
+
+class InventoryEngine:
+    # Datasets, lookup indexes and models shared by every Flask app. The apps
+    # only translate HTTP requests into calls on this object and format the
+    # results their templates and front ends expect.
+    #
+    # Everything is read from the current InventorySnapshot. reload() builds
+    # a complete new snapshot next to the old one and then swaps a single
+    # reference, so requests never wait on a reload and never see a half-
+    # built state; a call that started on the old snapshot finishes on it.
+    def __init__(self, **config):
+        self.config = config
+        self._snapshot = InventorySnapshot(**config)
+        # Stock changes logged by a StockLedger but not yet written to the
+        # stock file, per fabric, and the last movement applied; reloads
+        # apply them on top of the file
+        self.stock_deltas = {}
+        self.stock_seq = 0
+        self._reload_lock = threading.Lock()
+        self._reload_callbacks = []
+        self.reloads = deque(maxlen=20)
+        self._watcher = None
+        self._watch_interval = None
+        self._stopping = threading.Event()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def __getattr__(self, name):
+        # Datasets, indexes and lookup methods come from the current snapshot
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._snapshot, name)
+
+    def __contains__(self, fabric_type):
+        # `fabric in engine`: is it in the current stock catalog
+        return fabric_type in self._snapshot.stock_index
+
+    def data_version(self):
+        return self._snapshot.data_version()
+
+    def on_reload(self, callback):
+        # callback(snapshot) runs after each successful swap
+        self._reload_callbacks.append(callback)
+
+    def reload(self, reason="manual", full=False):
+        # Builds a new snapshot and swaps it in; on failure the current one
+        # stays in service. Unchanged files are reused from the current
+        # snapshot unless `full`. Returns a report with per-phase timings.
+        with self._reload_lock:
+            started = time.perf_counter()
+            report = {"reason": reason, "started_at": time.time()}
+            try:
+                snapshot = InventorySnapshot(previous=None if full else self._snapshot, stock_deltas=self.stock_deltas,
+                                             stock_seq=self.stock_seq, **self.config)
+            except Exception as e:
+                snapshot = None
+                report.update(ok=False, error=f"{type(e).__name__}: {e}")
+                RELOADS.labels("error").inc()
+                print(f"Reload failed, still serving version {self._snapshot.source_version}: {e}")
+            else:
+                previous = self._snapshot.source_version
+                self._snapshot = snapshot
+                report.update(ok=True, previous_version=previous, version=snapshot.source_version,
+                              timings=snapshot.timings, reused=snapshot.reused)
+                RELOADS.labels("ok").inc()
+            report["seconds"] = round(time.perf_counter() - started, 4)
+            self.reloads.append(report)
+        if snapshot is not None:
+            for callback in self._reload_callbacks:
+                callback(snapshot)
+        return report
+
+    def adjust_stock(self, deltas, seq):
+        # Swaps in a snapshot with {fabric: change} applied, for movements a
+        # StockLedger has durably logged up to `seq`. Serialized with
+        # reloads, so a reload never misses or repeats a batch.
+        with self._reload_lock:
+            self._snapshot = self._snapshot.with_stock_deltas(deltas, seq)
+            _add_deltas(self.stock_deltas, deltas)
+            self.stock_seq = seq
+            return self._snapshot
+
+    def stock_checkpoint(self):
+        # (snapshot, changes it holds beyond the stock file, last movement)
+        with self._reload_lock:
+            return self._snapshot, dict(self.stock_deltas), self.stock_seq
+
+    def replace_stock_file(self, path, checkpoint):
+        # Moves `path`, the stock file rewritten with the levels of the
+        # stock_checkpoint() `checkpoint`, over the stock file. The changes
+        # it folds in are no longer outstanding, and the current snapshot
+        # takes the new file's stamps, so the watcher does not reload it.
+        # Returns False, leaving everything as it was, if the stock file
+        # changed on disk (or was reloaded) since the checkpoint.
+        snapshot, folded, _ = checkpoint
+        with self._reload_lock:
+            stock_file = snapshot.stock_file
+            if (self._snapshot.file_stamps != snapshot.file_stamps
+                    or _file_stamps([stock_file])[stock_file] != snapshot.file_stamps[stock_file]):
+                return False
+            os.replace(path, stock_file)
+            _add_deltas(self.stock_deltas, folded, -1)
+            self._snapshot = self._snapshot.with_file_stamps(_file_stamps([stock_file]))
+            return True
+
+    def reload_status(self):
+        return {
+            "version": self._snapshot.source_version,
+            "loaded_at": self._snapshot.loaded_at,
+            "timings": self._snapshot.timings,
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+            "reloads": list(self.reloads),
+        }
+
+    def start_watcher(self, interval=2.0):
+        # Polls the source files and reloads once a change has settled (the
+        # same stamps on two polls in a row, so a half-written CSV is not
+        # loaded). Restarted in the child after a fork, since threads do
+        # not survive one.
+        self._watch_interval = interval
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        if self._watcher is None and hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart_watcher)
+        self._stopping.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stopping.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def _restart_watcher(self):
+        self._watcher = None
+        self._stopping = threading.Event()
+        self._reload_lock = threading.Lock()
+        self.start_watcher(self._watch_interval)
+
+    def _watch(self, interval):
+        paths = list(self._snapshot.file_stamps)
+        pending = None
+        failed = None
+        while not self._stopping.wait(interval):
+            stamps = _file_stamps(paths)
+            if stamps == self._snapshot.file_stamps or stamps == failed:
+                # Unchanged, or the same files already failed to load
+                pending = None
+            elif stamps != pending:
+                pending = stamps
+            else:
+                changed = [path for path in paths if stamps[path] != self._snapshot.file_stamps.get(path)]
+                report = self.reload(reason="changed: " + ", ".join(changed))
+                failed = None if report["ok"] else stamps
+                pending = None
+
+
+class _Stopwatch:
+    def __init__(self):
+        self.laps = {}
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.laps[name] = round(now - self._last, 4)
+        self.laps["total"] = round(now - self._start, 4)
+        self._last = now
+
+
+def _first_rows(stock_df):
+    # The loader has already normalized the names
+    keys = stock_df["Fabric Type"]
+    first = np.flatnonzero((~keys.duplicated() & keys.notna()).to_numpy())
+    return pd.Series(first, index=pd.Index(keys.iloc[first].to_numpy(), dtype=object))
+
+
+def _apply_stock_deltas(stock_df, rows, deltas):
+    # Adds {fabric: change} to each fabric's first stock row (`rows` from
+    # _first_rows). Returns the new frame, which shares every column but the
+    # stock one, and the fabrics it found with their row positions and new
+    # levels; fabrics no longer in the stock table are skipped.
+    names = np.asarray(list(deltas), dtype=object)
+    found = rows.index.get_indexer(names)
+    changes = np.fromiter(deltas.values(), dtype=np.int64, count=len(names))[found >= 0]
+    names = names[found >= 0]
+    positions = rows.to_numpy()[found[found >= 0]]
+    levels = stock_df["Stock Available"].to_numpy(copy=True)
+    levels[positions] += changes
+    return stock_df.assign(**{"Stock Available": levels}), names, positions, levels[positions]
+
+
+def _add_deltas(totals, deltas, sign=1):
+    # Per-fabric running totals, without the fabrics that net out to zero
+    for name, delta in deltas.items():
+        total = totals.get(name, 0) + sign * delta
+        if total:
+            totals[name] = total
+        else:
+            totals.pop(name, None)
+
+
+def _file_stamps(paths):
+    stamps = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamps[path] = None
+    return stamps
+
+
+def _source_version(stamps):
+    # Short fingerprint of the loaded files (path, mtime and size of each)
+    digest = hashlib.blake2b(digest_size=8)
+    for path, stamp in sorted(stamps.items()):
+        digest.update(f"{path}:{stamp};".encode())
+    return digest.hexdigest()
+
+
+def demand_status(fabric_type, historical_demand, current_demand, market_overrides=True):
+    if market_overrides and fabric_type in INDIA_HIGH_DEMAND:
+        return "High Demand"
+    if market_overrides and fabric_type in INDIA_LOW_DEMAND:
+        return "Low Demand"
+    if current_demand > historical_demand * 1.25:
+        return "High Demand"
+    if current_demand < historical_demand * 0.75:
+        return "Low Demand"
+    return "Stable Demand"
+
+
+def demand_statuses(fabric_types, historical_demand, current_demand, market_overrides=True):
+    # demand_status() over whole columns
+    fabric_types = np.asarray(fabric_types, dtype=object)
+    historical_demand = np.asarray(historical_demand, dtype=np.float64)
+    current_demand = np.asarray(current_demand, dtype=np.float64)
+    conditions = [current_demand > historical_demand * 1.25, current_demand < historical_demand * 0.75]
+    choices = ["High Demand", "Low Demand"]
+    if market_overrides:
+        conditions = [np.isin(fabric_types, list(INDIA_HIGH_DEMAND)),
+                      np.isin(fabric_types, list(INDIA_LOW_DEMAND))] + conditions
+        choices = choices + choices
+    return np.select(conditions, choices, "Stable Demand").astype(object)
+
+
+def build_recycling_steps(fabric_name, biodegradable, disposal_method, detailed=True):
+    # `detailed` selects the longer wording used by the dashboard apps
+    steps = [f"Recycling Guide for {fabric_name}"]
+    steps.append("Step 1: Collect and separate clean fabric waste.")
+    if biodegradable:
+        if detailed:
+            steps.append("Step 2: If reusable, send for upcycling (convert into rags, bags, stuffing).")
+        else:
+            steps.append("Step 2: If reusable, send for upcycling.")
+        if disposal_method == "Composting":
+            if detailed:
+                steps.append("Step 3: If not reusable, send for composting (fabric decomposes naturally).")
+            else:
+                steps.append("Step 3: Compost the biodegradable fabric.")
+        elif disposal_method == "Chemical Recycling":
+            if detailed:
+                steps.append("Step 3: Process through chemical recycling to extract reusable fibers.")
+            else:
+                steps.append("Step 3: Send for chemical recycling.")
+    else:
+        if disposal_method == "Mechanical Recycling":
+            if detailed:
+                steps.append("Step 2: Shred and process the fabric into recycled fibers.")
+                steps.append("Step 3: Convert into new fabric materials for reuse.")
+            else:
+                steps.append("Step 2: Shred and convert into fibers.")
+        elif disposal_method == "Incineration":
+            if detailed:
+                steps.append("Step 2: If no recycling options are available, dispose of through incineration.")
+            else:
+                steps.append("Step 2: Dispose using incineration.")
+    return steps
+
+
+def get_engine(**config):
+    # Builds the process-wide engine on first use. Under a pre-forking server
+    # that imports the app before forking (e.g. `gunicorn --preload`), the
+    # workers inherit it copy-on-write. gc.freeze() moves the loaded objects
+    # out of the collector's reach, so GC passes in the workers do not touch
+    # (and copy) those pages.
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = InventoryEngine(**config)
+                gc.freeze()
+    return _engine
@@ -0,0 +1,197 @@
+import base64
+import io
+import json
+import numpy as np
+import pandas as pd
+from .fabric_index import normalize_fabric_name
+from .forecast import DEMAND_COLUMNS
+from .metrics import EXPORT_ROWS
+from .price_models import numeric_columns
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+# Media type and file extension per export format; Arrow IPC streams need pyarrow
+EXPORT_FORMATS = {"csv": ("text/csv", "csv"), "ndjson": ("application/x-ndjson", "ndjson")}
+if pyarrow is not None:
+    EXPORT_FORMATS["arrow"] = ("application/vnd.apache.arrow.stream", "arrows")
+# Rows serialized at a time, which bounds an export's memory whatever its size
+CHUNK_ROWS = 5000
+# Column kinds of the export schemas and the pandas dtypes they are written from
+DTYPES = {"int": "Int64", "float": "float64", "str": "str"}
+
+INVENTORY_COLUMNS = [
+    ("id", "int"),
+    ("fabric_type", "str"),
+    ("stock_available", "int"),
+    ("price_per_unit", "int"),
+    ("unit_type", "str"),
+    ("historical_demand", "int"),
+    ("current_demand", "int"),
+    ("future_demand", "int"),
+    ("predicted_price", "float"),
+    ("demand_status", "str"),
+]
+
+
+def encode_cursor(key):
+    # Opaque, URL-safe token for the sort key of the last row a page ended on
+    return base64.urlsafe_b64encode(json.dumps(list(key), separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Malformed cursor") from None
+    if not isinstance(key, list) or not all(isinstance(value, (int, float)) for value in key):
+        raise ValueError("Malformed cursor")
+    return key
+
+
+def price_table(demand_df, price_models):
+    # Per fabric with a price model (a PriceModelRegistry): the demand
+    # figures of the row its price is predicted for and the price
+    # predict_price() serves, for joining onto stock rows
+    keys = price_models.names()
+    models = [price_models.get(key) for key in keys]
+    figures = numeric_columns(demand_df.iloc[[model.row for model in models]], DEMAND_COLUMNS)
+    return pd.DataFrame({
+        "historical_demand": pd.array(figures[:, 0], dtype="Int64"),
+        "current_demand": pd.array(figures[:, 1], dtype="Int64"),
+        "future_demand": pd.array(figures[:, 2], dtype="Int64"),
+        "predicted_price": np.array([round(model.predict(), 2) for model in models], dtype=np.float64),
+    }, index=pd.Index(keys, dtype=object))
+
+
+def inventory_export(stock_df, prices, after=None, limit=None, chunk_rows=CHUNK_ROWS, low_stock_threshold=None,
+                     fabric_type=None, prefix=None, unit_type=None, min_stock=None, max_stock=None,
+                     low_stock=False, demand_status=None):
+    # Stock rows in ID order joined with their fabric's demand figures and
+    # predicted price (`prices`: price_table() plus a demand_status column).
+    # Returns (next key, frames): frames yields at most chunk_rows joined
+    # rows at a time, filtered and starting after the row whose ID is
+    # after[0]; with a limit, the next key is where the following page
+    # starts, or None when this page is the last.
+    ids = stock_df["ID"].to_numpy()
+    order = None if stock_df["ID"].is_monotonic_increasing else np.argsort(ids, kind="stable")
+    start = 0 if not after else int(np.searchsorted(ids if order is None else ids[order], after[0], side="right"))
+    fabric_type = normalize_fabric_name(fabric_type) if fabric_type else None
+    prefix = normalize_fabric_name(prefix) if prefix else None
+    unit_type = normalize_fabric_name(unit_type) if unit_type else None
+    demand_status = normalize_fabric_name(demand_status) if demand_status else None
+
+    def matching():
+        # Filters one chunk at a time, so nothing proportional to the export is held
+        for low in range(start, len(ids), chunk_rows):
+            positions = np.arange(low, min(low + chunk_rows, len(ids)))
+            chunk = stock_df.iloc[positions if order is None else order[positions]]
+            joined = prices.reindex(chunk["Fabric Type"].to_numpy())
+            stock = chunk["Stock Available"].to_numpy()
+            mask = np.ones(len(chunk), dtype=bool)
+            if fabric_type:
+                mask &= (chunk["Fabric Type"] == fabric_type).to_numpy()
+            if prefix:
+                mask &= chunk["Fabric Type"].str.startswith(prefix).to_numpy(dtype=bool)
+            if unit_type:
+                mask &= (chunk["Unit Type"].astype("str").str.strip().str.lower() == unit_type).to_numpy(dtype=bool)
+            if min_stock is not None:
+                mask &= stock >= min_stock
+            if max_stock is not None:
+                mask &= stock <= max_stock
+            if low_stock:
+                mask &= stock < low_stock_threshold
+            if demand_status:
+                mask &= (joined["demand_status"].str.lower() == demand_status).to_numpy(dtype=bool, na_value=False)
+            if mask.any():
+                yield chunk[mask], joined[mask]
+
+    next_key = None
+    if limit is not None:
+        # A first pass over the page's rows (filters only) finds where the next one starts
+        seen = 0
+        last_id = None
+        for chunk, _ in matching():
+            if seen == limit:
+                # The page ended on the last row of an earlier chunk and more rows match
+                next_key = [last_id]
+                break
+            if seen + len(chunk) > limit:
+                next_key = [int(chunk["ID"].iloc[limit - seen - 1])]
+                break
+            seen += len(chunk)
+            last_id = int(chunk["ID"].iloc[-1])
+
+    def frames():
+        remaining = limit
+        for chunk, joined in matching():
+            if remaining is not None:
+                chunk, joined = chunk.iloc[:remaining], joined.iloc[:remaining]
+                remaining -= len(chunk)
+            yield _typed(pd.DataFrame({
+                "id": chunk["ID"].to_numpy(),
+                "fabric_type": chunk["Fabric Type"].to_numpy(),
+                "stock_available": chunk["Stock Available"].to_numpy(),
+                "price_per_unit": chunk["Price per Unit"].to_numpy(),
+                "unit_type": chunk["Unit Type"].astype("str").to_numpy(),
+                "historical_demand": joined["historical_demand"].to_numpy(),
+                "current_demand": joined["current_demand"].to_numpy(),
+                "future_demand": joined["future_demand"].to_numpy(),
+                "predicted_price": joined["predicted_price"].to_numpy(),
+                "demand_status": joined["demand_status"].to_numpy(),
+            }), INVENTORY_COLUMNS)
+            if remaining is not None and remaining <= 0:
+                return
+
+    return next_key, frames()
+
+
+def record_frames(batches, columns):
+    # Row tuples (e.g. from SQLite fetchmany) to typed frames of `columns`
+    names = [name for name, _ in columns]
+    for rows in batches:
+        yield _typed(pd.DataFrame.from_records(rows, columns=names), columns)
+
+
+def stream_export(frames, fmt, columns, dataset):
+    # Serializes frames one at a time as they are produced: a CSV header
+    # and then rows, one JSON object per line, or an Arrow IPC stream with
+    # one record batch per frame. An empty export is still a valid file.
+    template = _typed(pd.DataFrame({name: [] for name, _ in columns}), columns)
+    rows = EXPORT_ROWS.labels(dataset, fmt)
+    if fmt == "arrow":
+        yield from _arrow_stream(frames, template, rows)
+        return
+    if fmt == "csv":
+        yield template.to_csv(index=False, lineterminator="\n").encode()
+    for frame in frames:
+        if fmt == "csv":
+            yield frame.to_csv(index=False, header=False, lineterminator="\n").encode()
+        else:
+            yield frame.to_json(orient="records", lines=True, double_precision=15).encode()
+        rows.inc(len(frame))
+
+
+def _arrow_stream(frames, template, rows):
+    buffer = io.BytesIO()
+    schema = pyarrow.Schema.from_pandas(template, preserve_index=False)
+    with pyarrow.ipc.new_stream(buffer, schema) as writer:
+        for frame in frames:
+            writer.write_batch(pyarrow.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False))
+            rows.inc(len(frame))
+            yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def _typed(frame, columns):
+    return frame.astype({name: DTYPES[kind] for name, kind in columns})
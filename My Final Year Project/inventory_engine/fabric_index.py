@@ -0,0 +1,48 @@
+import copy
+
+# Replaced records an updated() index carries before it merges them into a new base
+MAX_UPDATES_SHARE = 0.125
+
+
+def normalize_fabric_name(name):
+    return str(name).strip().lower()
+
+
+class FabricIndex:
+    # Maps a normalized fabric name to its first row in a dataset, built once
+    # when the dataset loads so lookups skip the per-request column scan.
+    def __init__(self, df, column):
+        self.column = column
+        self._rows = {}
+        self._updates = {}
+        keys = df[column].astype(str).str.strip().str.lower()
+        for key, record in zip(keys, df.to_dict("records")):
+            self._rows.setdefault(key, record)
+
+    def get(self, name):
+        row = self._updates.get(name) or self._rows.get(name)
+        if row is None:
+            name = normalize_fabric_name(name)
+            row = self._updates.get(name) or self._rows.get(name)
+        return row
+
+    def updated(self, records):
+        # A new index with some names' records replaced, for a dataset that
+        # changed in place. It shares this index's rows, so building one
+        # costs the replaced records, not the dataset (until they add up to
+        # a share of it, when they are merged into a new base).
+        index = copy.copy(self)
+        index._updates = {**self._updates, **records}
+        if len(index._updates) > len(self._rows) * MAX_UPDATES_SHARE:
+            index._rows = {**self._rows, **index._updates}
+            index._updates = {}
+        return index
+
+    def names(self):
+        return list(self._rows)
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __len__(self):
+        return len(self._rows)
@@ -0,0 +1,289 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+import numpy as np
+import pandas as pd
+from .fabric_index import normalize_fabric_name
+
+SOURCES = ("stock", "demand", "waste")
+# Letters and digits are separate words, so "organza114" still finds "organza 114"
+WORD = re.compile(r"[a-z]+|[0-9]+")
+DEFAULT_LIMIT = 10
+# Words that say nothing about which fabric is meant: "bamboo" should find
+# "Bamboo Fabric" first, and "silk fabric" should find "Silk"
+NOISE_WORDS = frozenset(["fabric", "fabrics", "cloth", "material", "textile"])
+# Completions considered for a prefix, most widely used words first
+MAX_PREFIX_WORDS = 32
+# Vocabulary words checked with the edit distance per misspelt word
+MAX_FUZZY_CANDIDATES = 200
+MIN_FUZZY_LENGTH = 3
+# best_match() stands a typo in for an exact name, so it needs longer words:
+# "gold" is a word of its own, not one edit from "cold"
+MIN_MATCH_FUZZY_LENGTH = 5
+# Best-ranked names read per query, whatever the catalog size
+MAX_CANDIDATES = 2048
+
+
+def max_edits(word, strict=False):
+    # Typos tolerated in a query word of this length (strict: by best_match())
+    if len(word) < (MIN_MATCH_FUZZY_LENGTH if strict else MIN_FUZZY_LENGTH):
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    # Optimal string alignment distance (a transposition counts as one
+    # edit), or limit + 1 as soon as it must exceed `limit`
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _grams(word):
+    padded = f" {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class FabricSearch:
+    # Typo-tolerant search over every fabric name in the stock, demand and
+    # waste datasets, built once per snapshot. Names are split into words;
+    # a query matches the names that contain each of its words, spelled
+    # exactly, within max_edits() typos, or (the last word, for
+    # autocomplete) as a prefix.
+    #
+    #   vocabulary  the distinct words, sorted, so the completions of a
+    #               prefix are one contiguous range found by bisection (a
+    #               flattened trie)
+    #   postings    ids of the names containing each word, as slices of one
+    #               int32 array
+    #   grams       word ids per (word length, trigram), to find spelling
+    #               candidates of about the right length
+    #
+    # Results are ranked: the exact name, then by unmatched query words,
+    # typos and completed prefixes, words the name has beyond the query,
+    # and name length. Name ids are assigned in that last order (fewest
+    # words, then shortest), so every posting list is sorted best first: a
+    # query reads at most MAX_CANDIDATES names off the front of its rarest
+    # word's lists and checks its other words by binary search, which keeps
+    # common words like "cotton" as cheap on a million names as on a hundred.
+    def __init__(self, names_by_source):
+        # names_by_source: {"stock": names, ...}, lists or Series of raw names
+        sources = pd.concat([
+            pd.DataFrame({"name": np.asarray(names_by_source.get(source, ()), dtype=object), "bit": 1 << bit})
+            for bit, source in enumerate(SOURCES)
+        ], ignore_index=True).drop_duplicates()
+        sources["name"] = sources["name"].map(normalize_fabric_name)
+        sources = sources[sources["name"] != ""].drop_duplicates().groupby("name", sort=False)["bit"].sum()
+
+        names = pd.Series(sources.index.to_numpy(dtype=object), dtype=object)
+        words = names.str.findall(WORD.pattern).explode().dropna()
+        word_counts = np.bincount(words.index[~words.isin(NOISE_WORDS)], minlength=len(names))
+        order = np.lexsort((names.str.len().to_numpy(), word_counts))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        self.names = names.to_numpy()[order]
+        self.name_ids = {name: i for i, name in enumerate(self.names)}
+        self.sources = sources.to_numpy(dtype=np.uint8)[order]
+        self.word_counts = word_counts[order]
+
+        codes, vocabulary = pd.factorize(words, sort=True)
+        self.vocabulary = list(vocabulary)
+        self.word_ids = {word: i for i, word in enumerate(self.vocabulary)}
+        # (word, name) pairs sorted by word then name rank; a word repeated within a name is posted once
+        size = max(len(order), 1)
+        pairs = np.sort(codes.astype(np.int64) * size + rank[words.index.to_numpy(dtype=np.int64)])
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+        word_of_pair, name_ids = np.divmod(pairs, size)
+        self.postings = name_ids.astype(np.int32)
+        self.offsets = np.searchsorted(word_of_pair, np.arange(len(self.vocabulary) + 1))
+        self.frequency = np.diff(self.offsets)
+
+        grams = {}
+        for word_id, word in enumerate(self.vocabulary):
+            for gram in set(_grams(word)):
+                grams.setdefault((len(word), gram), []).append(word_id)
+        self.grams = grams
+
+    def __len__(self):
+        return len(self.names)
+
+    def _posting(self, word_id):
+        return self.postings[self.offsets[word_id]:self.offsets[word_id + 1]]
+
+    def _prefix_words(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\uffff", start)
+        if end - start > MAX_PREFIX_WORDS:
+            top = np.argpartition(-self.frequency[start:end], MAX_PREFIX_WORDS)[:MAX_PREFIX_WORDS]
+            return [start + int(i) for i in top]
+        return list(range(start, end))
+
+    def _fuzzy_words(self, word, strict=False):
+        # (word id, edits) for vocabulary words within max_edits(word, strict)
+        limit = max_edits(word, strict)
+        if limit == 0:
+            return []
+        grams = _grams(word)
+        shared = Counter()
+        for length in range(len(word) - limit, len(word) + limit + 1):
+            for gram in grams:
+                shared.update(self.grams.get((length, gram), ()))
+        # Every edit changes at most 3 trigrams
+        needed = max(1, len(word) - 3 * limit)
+        matches = []
+        for word_id, count in shared.most_common(MAX_FUZZY_CANDIDATES):
+            if count < needed:
+                break
+            edits = edit_distance(word, self.vocabulary[word_id], limit)
+            if edits <= limit:
+                matches.append((word_id, edits))
+        return matches
+
+    def _word_matches(self, word, prefix, strict=False):
+        # (word id, cost) per way of reading one query word: 0 for the word
+        # itself, 1 for a completion of it, 2 per typo
+        exact = self.word_ids.get(word)
+        if prefix:
+            matches = [(word_id, 0 if word_id == exact else 1) for word_id in self._prefix_words(word)]
+            if exact is not None and all(word_id != exact for word_id, _ in matches):
+                matches.append((exact, 0))
+        else:
+            matches = [] if exact is None else [(exact, 0)]
+        if not matches:
+            matches = [(word_id, 2 * edits) for word_id, edits in self._fuzzy_words(word, strict)]
+        return matches
+
+    def _leading(self, matches, source_bit):
+        # The best-ranked names containing any reading of one query word,
+        # with the cheapest reading's cost per name
+        share = max(DEFAULT_LIMIT, MAX_CANDIDATES // len(matches))
+        ids = []
+        costs = []
+        for word_id, cost in matches:
+            names = self._posting(word_id)
+            if source_bit:
+                front = names[:share * 8]
+                kept = front[(self.sources[front] & source_bit) != 0]
+                if len(kept) < share and len(front) < len(names):
+                    kept = names[(self.sources[names] & source_bit) != 0]
+                names = kept
+            ids.append(names[:share])
+            costs.append(np.full(len(ids[-1]), cost, dtype=np.int64))
+        ids = np.concatenate(ids)
+        costs = np.concatenate(costs)
+        if len(matches) > 1:
+            order = np.lexsort((costs, ids))
+            ids, costs = ids[order], costs[order]
+            first = np.ones(len(ids), dtype=bool)
+            first[1:] = ids[1:] != ids[:-1]
+            ids, costs = ids[first], costs[first]
+        return ids.astype(np.int64), costs
+
+    def _cost_in(self, candidates, matches):
+        # Cheapest reading of a query word per candidate name, -1 where none matches
+        best = np.full(len(candidates), -1, dtype=np.int64)
+        for word_id, cost in sorted(matches, key=lambda match: -match[1]):
+            names = self._posting(word_id)
+            if not len(names):
+                continue
+            found = names[np.minimum(np.searchsorted(names, candidates), len(names) - 1)] == candidates
+            best[found] = cost
+        return best
+
+    def search(self, query, limit=DEFAULT_LIMIT, source=None, prefix=True):
+        # Ranked matches for `query`, best first. `source` keeps names from
+        # one dataset; prefix=False turns off completing the last word.
+        query = normalize_fabric_name(query) if query is not None else ""
+        if limit <= 0:
+            return []
+        candidates, unmatched, cost, _ = self._ranked(query, source, prefix)
+        return [self._result(query, candidates[i], int(unmatched[i]), int(cost[i]))
+                for i in range(min(limit, len(candidates)))]
+
+    def best_match(self, query, source=None):
+        # The one name the query spells out: every word of the query matches
+        # one of the name's and every word of the name is matched (typos only
+        # in words of MIN_MATCH_FUZZY_LENGTH letters or more, no completions).
+        # None when no name qualifies or several do equally well. A query of
+        # only noise words names no fabric.
+        query = normalize_fabric_name(query) if query is not None else ""
+        if all(word in NOISE_WORDS for word in WORD.findall(query)):
+            return None
+        candidates, unmatched, cost, extra = self._ranked(query, source, prefix=False, strict=True)
+        whole = (unmatched == 0) & (extra == 0)
+        candidates, cost = candidates[whole], cost[whole]
+        if not len(candidates):
+            return None
+        best = self.names[candidates[0]]
+        if best != query and len(candidates) > 1 and cost[1] == cost[0]:
+            return None
+        return best
+
+    def _ranked(self, query, source, prefix, strict=False):
+        # (candidate name ids, unmatched query words, cost, extra name words),
+        # best first, for a normalized query
+        none = (np.empty(0, dtype=np.int64),) * 4
+        words = WORD.findall(query)
+        words = [word for word in words if word not in NOISE_WORDS] or words
+        if not words or not len(self.names):
+            return none
+        readings = [self._word_matches(word, prefix and i == len(words) - 1, strict) for i, word in enumerate(words)]
+        readings = [matches for matches in readings if matches]
+        if not readings:
+            return none
+
+        # Candidates come from the query word found in the fewest names
+        source_bit = 0 if source is None else 1 << SOURCES.index(source)
+        rarest = min(range(len(readings)),
+                     key=lambda i: sum(int(self.frequency[word_id]) for word_id, _ in readings[i]))
+        candidates, cost = self._leading(readings.pop(rarest), source_bit)
+        exact = self.name_ids.get(query)
+        if exact is not None and (not source_bit or self.sources[exact] & source_bit) and exact not in candidates:
+            candidates = np.append(candidates, exact)
+            cost = np.append(cost, 0)
+        if not len(candidates):
+            return none
+        matched = np.ones(len(candidates), dtype=np.int64)
+        for matches in readings:
+            best = self._cost_in(candidates, matches)
+            found = best >= 0
+            matched += found
+            cost += np.where(found, best, 0)
+
+        unmatched = len(words) - matched
+        # Matched noise words (a completed "fab") are not extra either
+        extra = np.maximum(self.word_counts[candidates] - matched, 0)
+        inexact = candidates != (-1 if exact is None else exact)
+        rank = np.lexsort((candidates, extra, cost, unmatched, inexact))
+        return candidates[rank], unmatched[rank], cost[rank], extra[rank]
+
+    def _result(self, query, name_id, unmatched, cost):
+        name = self.names[name_id]
+        if name == query:
+            match = "exact"
+        elif unmatched:
+            match = "partial"
+        elif cost >= 2:
+            match = "fuzzy"
+        else:
+            match = "prefix" if name.startswith(query) else "words"
+        mask = int(self.sources[name_id])
+        return {
+            "name": name,
+            "sources": [source for bit, source in enumerate(SOURCES) if mask & (1 << bit)],
+            "match": match,
+            "unmatched": unmatched,
+        }
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from .inventory_summary import HIGH_DEMAND_RATIO
+from .price_models import PRICE_FEATURES, PriceFit, numeric_columns
+
+LOW_DEMAND_RATIO = 0.75
+# Two-sided 95% bands
+BAND_Z = 1.96
+# Periods after Current Demand to forecast; 1 is the Future Demand period
+HORIZON = 1
+# Fits with fewer residual degrees of freedom use the catalog-wide spread
+MIN_OWN_DOF = 3
+DEMAND_COLUMNS = ["Historical Demand", "Current Demand", "Future Demand"]
+
+
+def _catalog_price_fit(demand_df):
+    # One price regression over the whole catalog: (slopes, residual
+    # standard deviation). Most fabrics have a single demand row, which
+    # fixes their price but says nothing about how it moves with demand or
+    # how much it scatters; those fabrics borrow the catalog-wide figures.
+    X = numeric_columns(demand_df, PRICE_FEATURES)
+    y = numeric_columns(demand_df, ["Price per Unit"])[:, 0]
+    finite = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    X, y = X[finite], y[finite]
+    if len(y) <= X.shape[1] + 1:
+        return np.zeros(X.shape[1]), np.nan
+    X = np.column_stack([np.ones(len(y)), X])
+    coef, _, rank, _ = np.linalg.lstsq(X, y, rcond=None)
+    residuals = y - X @ coef
+    return coef[1:], float(np.sqrt(residuals @ residuals / (len(y) - rank)))
+
+
+def compute_forecasts(demand_df, z=BAND_Z, horizon=HORIZON):
+    # Price and demand forecasts with prediction bands for every fabric, in
+    # one vectorized pass over the demand table (no per-fabric loop):
+    #
+    #   price           the fabric's price model at its first row, as predict_price() serves
+    #   price_forecast  the same model one period on: Current Demand becomes
+    #                   the historical figure and Future Demand the current one
+    #                   (catalog-wide slopes for fabrics whose rows cannot fix their own)
+    #   demand_forecast a least-squares trend through Historical, Current and
+    #                   Future Demand (periods -1, 0, +1) of all the fabric's
+    #                   rows, read off at `horizon` periods after Current Demand
+    #   *_lower/_upper  z-sigma prediction intervals from each fit's residuals
+    #   demand_status   High/Low/Stable from the forecast against Current
+    #                   Demand, with the ratios the dashboard uses (no
+    #                   hard-coded market overrides); None without a demand trend
+    #
+    # Every fabric with a price model is forecast. Blank or non-numeric
+    # figures leave a row out of only the fits that read them: the price fit
+    # uses PriceFit's rows, the demand trend the rows with all three demand
+    # figures, and a missing Future Demand on the first row leaves just the
+    # price projection (and a fabric without demand rows its demand
+    # forecast) empty.
+    fit = PriceFit(demand_df)
+    demand = numeric_columns(demand_df, DEMAND_COLUMNS)
+    codes = pd.Index(fit.keys).get_indexer(demand_df["Fabric Type"].str.strip().str.lower())
+    valid = (codes >= 0) & np.isfinite(demand).all(axis=1)
+    codes = codes[valid]
+    demand = demand[valid]
+    groups = len(fit.keys)
+
+    def group_sum(values):
+        return np.bincount(codes, weights=values, minlength=groups)
+
+    # Price: the next period's features come from the first row's Current and Future Demand
+    next_features = numeric_columns(demand_df.iloc[fit.first_row], ["Current Demand", "Future Demand"])
+    catalog_coef, catalog_sigma = _catalog_price_fit(demand_df)
+    price = fit.predict(fit.features)
+    price_forecast = np.where(fit.rank > 0, fit.predict(next_features),
+                              price + (next_features - fit.features) @ catalog_coef)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        own_sigma = np.sqrt(fit.rss / fit.dof)
+    price_sigma = np.where(fit.dof >= MIN_OWN_DOF, own_sigma, catalog_sigma)
+    price_margin = z * price_sigma * np.sqrt(1 + fit.leverage(next_features))
+
+    # Demand: 3 points per row at t = -1, 0, +1, so t has mean 0 and the
+    # slope and its spread are closed-form sums
+    rows = np.bincount(codes, minlength=groups)
+    points = 3 * rows
+    sums = [group_sum(demand[:, i]) for i in range(3)]
+    squares = group_sum((demand * demand).sum(axis=1))
+    t_scatter = 2.0 * rows
+    dof = points - 2
+    fitted = dof > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = (sums[0] + sums[1] + sums[2]) / points
+        slope = (sums[2] - sums[0]) / t_scatter
+        rss = np.maximum(squares - points * mean * mean - slope * slope * t_scatter, 0.0)
+        pooled_sigma = np.sqrt(rss[fitted].sum() / dof[fitted].sum()) if fitted.any() else np.nan
+        demand_sigma = np.where(dof >= MIN_OWN_DOF, np.sqrt(rss / dof), pooled_sigma)
+        demand_forecast = np.maximum(mean + slope * horizon, 0.0)
+        demand_margin = z * demand_sigma * np.sqrt(1 + 1 / points + horizon * horizon / t_scatter)
+        current = sums[1] / rows
+
+    status = np.select(
+        [demand_forecast > current * HIGH_DEMAND_RATIO, demand_forecast < current * LOW_DEMAND_RATIO],
+        ["High Demand", "Low Demand"], "Stable Demand").astype(object)
+    status[~fitted] = None
+
+    return pd.DataFrame({
+        "fabric_type": np.asarray(fit.keys, dtype=object),
+        "rows": fit.rows,
+        "price": price,
+        "price_forecast": price_forecast,
+        "price_lower": np.maximum(price_forecast - price_margin, 0.0),
+        "price_upper": price_forecast + price_margin,
+        "demand_current": current,
+        "demand_forecast": demand_forecast,
+        "demand_lower": np.maximum(demand_forecast - demand_margin, 0.0),
+        "demand_upper": demand_forecast + demand_margin,
+        "demand_trend": slope,
+        "demand_status": status,
+    }).set_index("fabric_type", drop=False)
+
+
+def forecast_page(forecasts, status=None, limit=None, offset=0):
+    # (total matching, one page of forecasts) in catalog order
+    if status:
+        forecasts = forecasts[forecasts["demand_status"].str.lower() == status.strip().lower()]
+    page = forecasts.iloc[offset:] if limit is None else forecasts.iloc[offset:offset + limit]
+    return len(forecasts), [_forecast_row(row) for row in page.to_dict("records")]
+
+
+def forecast_status(forecasts, fabric_type):
+    if fabric_type not in forecasts.index:
+        return None
+    return _forecast_row(forecasts.loc[fabric_type].to_dict())
+
+
+def _rounded(value, digits=2):
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def _forecast_row(row):
+    return {
+        "fabric_type": row["fabric_type"],
+        "rows": int(row["rows"]),
+        "price": _rounded(row["price"]),
+        "price_forecast": _rounded(row["price_forecast"]),
+        "price_band": [_rounded(row["price_lower"]), _rounded(row["price_upper"])],
+        "demand_current": _rounded(row["demand_current"], 1),
+        "demand_forecast": _rounded(row["demand_forecast"], 1),
+        "demand_band": [_rounded(row["demand_lower"], 1), _rounded(row["demand_upper"], 1)],
+        "demand_trend": _rounded(row["demand_trend"]),
+        "demand_status": row["demand_status"] if isinstance(row["demand_status"], str) else None,
+    }
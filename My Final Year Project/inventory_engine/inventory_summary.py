@@ -0,0 +1,108 @@
+import threading
+from collections import Counter
+
+LOW_STOCK_THRESHOLD = 100
+HIGH_DEMAND_RATIO = 1.25
+
+
+class InventorySummary:
+    # Running dashboard totals over the stock and demand tables.
+    #
+    # Built with one pass over each frame, then kept current through the
+    # set_*/remove_* methods as individual rows change, so reading the
+    # summary never rescans the catalog. Rows are identified by any stable
+    # key (the DataFrame index by default).
+    def __init__(self, stock_df, demand_df, low_stock_threshold=LOW_STOCK_THRESHOLD,
+                 high_demand_ratio=HIGH_DEMAND_RATIO):
+        self.low_stock_threshold = low_stock_threshold
+        self.high_demand_ratio = high_demand_ratio
+        self._lock = threading.Lock()
+        self._stock = {}
+        self._fabric_rows = Counter()
+        self._total_stock = 0
+        self._low_stock = {}
+        self._demand = {}
+        self._high_demand = {}
+        self._cached = None
+
+        for key, fabric_type, stock in zip(stock_df.index, stock_df["Fabric Type"], stock_df["Stock Available"]):
+            self._set_stock(key, fabric_type, stock)
+        for key, fabric_type, historical, current in zip(
+            demand_df.index, demand_df["Fabric Type"], demand_df["Historical Demand"], demand_df["Current Demand"]
+        ):
+            self._set_demand(key, fabric_type, historical, current)
+
+    def _set_stock(self, key, fabric_type, stock):
+        self._remove_stock(key)
+        stock = stock.item() if hasattr(stock, "item") else stock
+        self._stock[key] = (fabric_type, stock)
+        self._fabric_rows[fabric_type] += 1
+        self._total_stock += stock
+        if stock < self.low_stock_threshold:
+            self._low_stock[key] = fabric_type
+        self._cached = None
+
+    def _remove_stock(self, key):
+        previous = self._stock.pop(key, None)
+        if previous is None:
+            return
+        fabric_type, stock = previous
+        self._fabric_rows[fabric_type] -= 1
+        if not self._fabric_rows[fabric_type]:
+            del self._fabric_rows[fabric_type]
+        self._total_stock -= stock
+        self._low_stock.pop(key, None)
+        self._cached = None
+
+    def _set_demand(self, key, fabric_type, historical, current):
+        self._demand[key] = fabric_type
+        if current > historical * self.high_demand_ratio:
+            self._high_demand[key] = fabric_type
+        else:
+            self._high_demand.pop(key, None)
+        self._cached = None
+
+    def _remove_demand(self, key):
+        if self._demand.pop(key, None) is not None:
+            self._high_demand.pop(key, None)
+            self._cached = None
+
+    def set_stock(self, key, fabric_type, stock):
+        with self._lock:
+            self._set_stock(key, fabric_type, stock)
+
+    def set_stock_many(self, rows):
+        # rows: (key, fabric_type, stock) for every row that changed
+        with self._lock:
+            for key, fabric_type, stock in rows:
+                self._set_stock(key, fabric_type, stock)
+
+    def remove_stock(self, key):
+        with self._lock:
+            self._remove_stock(key)
+
+    def set_demand(self, key, fabric_type, historical, current):
+        with self._lock:
+            self._set_demand(key, fabric_type, historical, current)
+
+    def remove_demand(self, key):
+        with self._lock:
+            self._remove_demand(key)
+
+    def snapshot(self):
+        # Same shape as the old get_inventory_summary() result; cached until
+        # the next change
+        summary = self._cached
+        if summary is not None:
+            return summary
+        with self._lock:
+            if self._cached is None:
+                self._cached = {
+                    'total_fabrics': len(self._fabric_rows),
+                    'current_inventory': self._total_stock,
+                    'low_stock_count': len(self._low_stock),
+                    'low_stock_names': list(self._low_stock.values()),
+                    'high_demand_count': len(self._high_demand),
+                    'high_demand_names': list(self._high_demand.values())
+                }
+            return self._cached
@@ -0,0 +1,393 @@
+import bisect
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from flask import Response, before_render_template, g, request, template_rendered
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; spans a cached lookup (sub-ms) up to a full catalog reload
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).strip().lower() not in ("0", "false", "no", "off", "")
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class _Metric:
+    # A metric family: one child per combination of label values, created
+    # on first use and kept for the life of the process
+    kind = None
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            yield from child.samples(self.name, dict(zip(self.labelnames, values)))
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class CounterMetric(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # counts[i] is the number of values in (buckets[i-1], buckets[i]]; the
+        # last slot is everything above the largest bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield f"{name}_bucket", dict(labels, le=_format_value(float(bound))), cumulative
+        yield f"{name}_sum", labels, total
+        yield f"{name}_count", labels, cumulative
+
+
+class HistogramMetric(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class MetricsRegistry:
+    # Counters and histograms updated in-process, plus collectors: callables
+    # run at scrape time that return (name, kind, help, [(labels, value)])
+    # families for state that is already counted elsewhere (serial device
+    # counters, cache hits). With `enabled` off, timed() and the request
+    # hooks skip all timing, leaving one attribute check per call.
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(CounterMetric, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(HistogramMetric, name, help, labelnames, buckets)
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = []
+
+        def family(name, kind, help, samples):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            family(metric.name, metric.kind, metric.help, metric.samples())
+        for collector in collectors:
+            try:
+                for name, kind, help, samples in collector():
+                    family(name, kind, help, ((name, labels, value) for labels, value in samples))
+            except Exception as e:
+                print(f"Metrics collector {collector!r} failed: {e}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+# Process-wide registry, like the engine. METRICS_ENABLED=0 turns timing off.
+REGISTRY = MetricsRegistry(enabled=_env_flag("METRICS_ENABLED", "1"))
+
+OPERATION_SECONDS = REGISTRY.histogram(
+    "inventory_operation_duration_seconds", "Time spent in engine lookups and model inference.", ["operation"])
+MODEL_TRAIN_SECONDS = REGISTRY.histogram(
+    "inventory_model_train_duration_seconds", "Time spent fitting models.", ["model"])
+DATASET_LOAD_SECONDS = REGISTRY.histogram(
+    "inventory_dataset_load_duration_seconds",
+    "Time spent loading one dataset, from its CSV or from the pickled snapshot.", ["dataset", "source"])
+SNAPSHOT_BUILD_SECONDS = REGISTRY.histogram(
+    "inventory_snapshot_build_duration_seconds", "Time spent building an engine snapshot, by phase.", ["phase"])
+RELOADS = REGISTRY.counter("inventory_reloads_total", "Engine reloads, by result.", ["result"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to produce a response (excluding streamed bodies).",
+    ["app", "endpoint", "method", "status"])
+TEMPLATE_SECONDS = REGISTRY.histogram(
+    "http_template_render_duration_seconds", "Time spent rendering templates.", ["app", "template"])
+EXPORT_ROWS = REGISTRY.counter("inventory_export_rows_total", "Rows streamed by the bulk exports.", ["dataset", "format"])
+SLOW_REQUESTS = REGISTRY.counter(
+    "http_slow_requests_total", "Requests that ran past the profiler threshold.", ["app", "endpoint"])
+
+
+def timed(histogram, *labels):
+    # Decorator recording the call's duration in histogram.labels(*labels)
+    child = histogram.labels(*labels)
+    registry = histogram.registry
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def observe(histogram, seconds, *labels):
+    if histogram.registry.enabled:
+        histogram.labels(*labels).observe(seconds)
+
+
+def _fold_stack(frame):
+    # "file:function;file:function;..." from the outermost call inwards, the
+    # collapsed-stack format flame graph tools read
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _InFlight:
+    __slots__ = ("label", "endpoint", "started", "forced", "stacks")
+
+    def __init__(self, label, endpoint, forced):
+        self.label = label
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.forced = forced
+        self.stacks = Counter()
+
+
+class SlowRequestProfiler:
+    # Sampling profiler for individual slow requests. A sampler thread wakes
+    # every `interval` while requests are in flight; once a request has run
+    # for `threshold` seconds it starts recording that request thread's
+    # stack on every wake-up. Fast requests are never sampled, so the cost
+    # is one dict insert/delete per request. A request can ask to be
+    # sampled from the start with ?profile=1. The last `keep` profiles are
+    # kept in memory.
+    def __init__(self, threshold=0.5, interval=0.005, keep=20):
+        self.threshold = threshold
+        self.interval = interval
+        self._in_flight = {}
+        self._profiles = deque(maxlen=keep)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def begin(self, label, endpoint, forced=False):
+        if self._thread is None or not self._thread.is_alive():
+            # Started lazily, so it also exists in forked workers
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        with self._lock:
+            self._in_flight[threading.get_ident()] = _InFlight(label, endpoint, forced)
+        self._wake.set()
+
+    def end(self):
+        # Returns the finished profile, or None if the request was not sampled
+        with self._lock:
+            request_state = self._in_flight.pop(threading.get_ident(), None)
+        if request_state is None or not request_state.stacks:
+            return None
+        profile = {
+            "id": next(self._ids),
+            "request": request_state.label,
+            "endpoint": request_state.endpoint,
+            "seconds": round(time.perf_counter() - request_state.started, 4),
+            "forced": request_state.forced,
+            "interval": self.interval,
+            "samples": sum(request_state.stacks.values()),
+            "stacks": request_state.stacks,
+        }
+        self._profiles.append(profile)
+        return profile
+
+    def profiles(self):
+        # Summaries, newest first, with each profile's five heaviest stacks
+        return [dict(profile, stacks=[{"stack": stack, "samples": count}
+                                      for stack, count in profile["stacks"].most_common(5)])
+                for profile in reversed(self._profiles)]
+
+    def collapsed(self, profile_id):
+        # One "stack count" line per distinct stack (flamegraph.pl / speedscope input)
+        for profile in self._profiles:
+            if profile["id"] == profile_id:
+                return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].most_common())
+        return None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._in_flight
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._lock:
+                due = [(ident, state) for ident, state in self._in_flight.items()
+                       if state.forced or now - state.started >= self.threshold]
+            if not due:
+                continue
+            frames = sys._current_frames()
+            for ident, state in due:
+                frame = frames.get(ident)
+                if frame is not None:
+                    state.stacks[_fold_stack(frame)] += 1
+
+
+def profiler_from_env():
+    # PROFILE_SLOW_REQUESTS=<seconds> turns the slow-request profiler on
+    threshold = os.environ.get("PROFILE_SLOW_REQUESTS", "").strip()
+    if not threshold:
+        return None
+    return SlowRequestProfiler(threshold=float(threshold))
+
+
+def instrument_app(app, registry=REGISTRY, profiler=None):
+    # Times every request and template render of `app` into the registry and
+    # runs the optional slow-request profiler around each request
+    name = app.name
+
+    @app.before_request
+    def _start_request_timer():
+        if registry.enabled:
+            g._request_started = time.perf_counter()
+        if profiler is not None:
+            profiler.begin(f"{request.method} {request.full_path.rstrip('?')}", request.endpoint or "unmatched",
+                           forced=request.args.get("profile") == "1")
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("_request_started", None)
+        if started is not None:
+            REQUEST_SECONDS.labels(name, request.endpoint or "unmatched", request.method,
+                                   response.status_code).observe(time.perf_counter() - started)
+        if profiler is not None:
+            profile = profiler.end()
+            if profile is not None:
+                response.headers["X-Profile-Id"] = str(profile["id"])
+                if not profile["forced"]:
+                    SLOW_REQUESTS.labels(name, profile["endpoint"]).inc()
+        return response
+
+    @app.teardown_request
+    def _end_profile(exc):
+        # after_request does not run if the response failed to build
+        if profiler is not None:
+            profiler.end()
+
+    def _template_started(sender, template, context, **extra):
+        if registry.enabled:
+            g.setdefault("_template_started", []).append(time.perf_counter())
+
+    def _template_rendered(sender, template, context, **extra):
+        started = g.get("_template_started")
+        if started:
+            TEMPLATE_SECONDS.labels(name, template.name).observe(time.perf_counter() - started.pop())
+
+    before_render_template.connect(_template_started, app, weak=False)
+    template_rendered.connect(_template_rendered, app, weak=False)
+    return profiler
+
+
+def metrics_response(registry=REGISTRY):
+    return Response(registry.render(), content_type=CONTENT_TYPE)
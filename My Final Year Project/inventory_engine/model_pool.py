@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# One worker keeps model work from competing with more than one request
+# thread at a time; batches past COMPILED_MAX_ROWS release the GIL anyway
+DEFAULT_WORKERS = 1
+DEFAULT_MAX_PENDING = 32
+DEFAULT_TIMEOUT = 5.0
+# Seconds a client is asked to wait after a 503
+RETRY_AFTER = 1
+
+
+class ModelPoolBusy(RuntimeError):
+    # Raised instead of queueing when max_pending computations are already waiting
+    pass
+
+
+class ModelPoolTimeout(TimeoutError):
+    pass
+
+
+class ModelPool:
+    # Runs model computations on a few worker threads instead of the request
+    # threads that need them. Calls with the same key while one is in flight
+    # share its result instead of computing it again. At most max_pending
+    # distinct computations are queued or running; past that, callers get
+    # ModelPoolBusy at once rather than piling up behind the model. A caller
+    # waits at most `timeout` seconds; the computation itself still finishes
+    # (and fills the model's memo) for whoever asks next.
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING, timeout=DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_after = RETRY_AFTER
+        self._executor = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def run(self, key, func, *args):
+        # func(*args), computed once per in-flight key
+        with self._lock:
+            future = self._inflight.get(key)
+            submitted = future is None
+            if submitted:
+                if len(self._inflight) >= self.max_pending:
+                    self.rejected += 1
+                    raise ModelPoolBusy(f"Model pool is busy ({self.max_pending} computations pending)")
+                if self._executor is None:
+                    # Started on first use, so importing the app starts no threads
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="model-pool")
+                future = self._executor.submit(func, *args)
+                self._inflight[key] = future
+                self.submitted += 1
+            else:
+                self.coalesced += 1
+        if submitted:
+            # Outside the lock: a future that is already done runs the callback right here
+            future.add_done_callback(lambda done: self._finished(key, done))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise ModelPoolTimeout(f"Model computation did not finish within {self.timeout:g}s") from None
+
+    def _finished(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def pending(self):
+        return len(self._inflight)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "timeout": self.timeout,
+            "pending": self.pending(),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+    def metric_families(self):
+        # Collector for MetricsRegistry.register_collector
+        return [
+            ("model_pool_submitted_total", "counter", "Model computations run on the pool.",
+             [({}, self.submitted)]),
+            ("model_pool_coalesced_total", "counter", "Calls that shared an in-flight computation.",
+             [({}, self.coalesced)]),
+            ("model_pool_rejected_total", "counter", "Calls turned away because the pool was full.",
+             [({}, self.rejected)]),
+            ("model_pool_timeouts_total", "counter", "Calls that gave up waiting for a result.",
+             [({}, self.timeouts)]),
+            ("model_pool_pending", "gauge", "Computations queued or running.", [({}, self.pending())]),
+        ]
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from .metrics import MODEL_TRAIN_SECONDS, timed
+
+PRICE_FEATURES = ["Historical Demand", "Current Demand"]
+# Singular values below this fraction of the largest count as zero
+SINGULAR_RCOND = 1e-10
+
+
+def numeric_columns(df, columns):
+    # The columns as one float array, NaN wherever a cell is blank or not a number
+    return df[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class PriceModel:
+    # Fitted coefficients of one fabric's price regression plus the row the
+    # apps predict for, so serving a price is a dot product, not a fit.
+    # `row` is that row's position in the demand table.
+    __slots__ = ("coef", "intercept", "features", "row")
+
+    def __init__(self, coef, intercept, features, row=None):
+        self.coef = coef
+        self.intercept = intercept
+        self.features = features
+        self.row = row
+
+    def predict(self, features=None):
+        if features is None:
+            features = self.features
+        return self.intercept + sum(c * x for c, x in zip(self.coef, features))
+
+
+class PriceFit:
+    # Least-squares fits of Price per Unit on PRICE_FEATURES for every fabric
+    # at once. Per fabric (group of demand rows) it keeps what the forecasts
+    # need besides the coefficients: the feature means, the pseudo-inverse
+    # of the centered scatter matrix and the residual sum of squares.
+    # Rows with a blank or non-numeric price or feature are left out; a
+    # fabric with none left gets no model.
+    def __init__(self, demand_df):
+        X = numeric_columns(demand_df, PRICE_FEATURES)
+        y = numeric_columns(demand_df, ["Price per Unit"])[:, 0]
+        finite = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        keys = demand_df["Fabric Type"].str.strip().str.lower().where(finite)
+        codes, self.keys = pd.factorize(keys)
+        valid = codes >= 0
+        codes = codes[valid]
+        X = X[valid]
+        y = y[valid]
+        groups = len(self.keys)
+        self.rows = np.bincount(codes, minlength=groups)
+
+        def group_sum(values):
+            return np.bincount(codes, weights=values, minlength=groups)
+
+        # Centering per group fits the intercept separately, as
+        # LinearRegression does; a fabric with one row (or with constant
+        # features) gets zero slopes and its mean price
+        self.x_mean = np.column_stack([group_sum(X[:, i]) for i in range(X.shape[1])]) / self.rows[:, None]
+        self.y_mean = group_sum(y) / self.rows
+        Xc = X - self.x_mean[codes]
+        yc = y - self.y_mean[codes]
+        features = range(X.shape[1])
+        scatter = np.stack([np.column_stack([group_sum(Xc[:, i] * Xc[:, j]) for j in features])
+                            for i in features], axis=1)
+        cross = np.column_stack([group_sum(Xc[:, i] * yc) for i in features])
+
+        # Minimum-norm solution of every group's normal equations (2x2
+        # systems, some of them singular) from one batched SVD
+        u, singular, vt = np.linalg.svd(scatter)
+        kept = singular > singular[:, :1] * SINGULAR_RCOND
+        inverse = np.divide(1.0, singular, out=np.zeros_like(singular), where=kept)
+        self.scatter_pinv = np.einsum("gji,gj,gkj->gik", vt, inverse, u)
+        self.rank = kept.sum(axis=1)
+        self.dof = self.rows - 1 - self.rank
+        self.coef = np.einsum("gij,gj->gi", self.scatter_pinv, cross)
+        self.intercept = self.y_mean - np.einsum("gi,gi->g", self.x_mean, self.coef)
+
+        residuals = yc - np.einsum("ni,ni->n", Xc, self.coef[codes])
+        self.rss = group_sum(residuals * residuals)
+
+        # The row predict_price() has always predicted for: the fabric's first one
+        first = np.full(groups, len(codes))
+        np.minimum.at(first, codes, np.arange(len(codes)))
+        self.features = X[first]
+        self.first_row = np.flatnonzero(valid)[first]
+
+    def predict(self, features):
+        # (groups, n_features) -> predicted price per group
+        return self.intercept + np.einsum("gi,gi->g", features, self.coef)
+
+    def leverage(self, features):
+        # x0's leverage in its group's fit, for prediction intervals
+        offset = features - self.x_mean
+        return 1.0 / self.rows + np.einsum("gi,gij,gj->g", offset, self.scatter_pinv, offset)
+
+
+@timed(MODEL_TRAIN_SECONDS, "price")
+def fit_price_models(demand_df):
+    fit = PriceFit(demand_df)
+    coefs = fit.coef.tolist()
+    intercepts = fit.intercept.tolist()
+    features = fit.features.tolist()
+    return {
+        key: PriceModel(tuple(coef), intercept, tuple(row), position)
+        for key, coef, intercept, row, position in zip(fit.keys.tolist(), coefs, intercepts, features,
+                                                       fit.first_row.tolist())
+    }
+
+
+class PriceModelRegistry:
+    # Every fabric's price model, fitted once per snapshot from its demand
+    # table. A changed demand CSV is refitted by the watcher's reload, which
+    # builds a new snapshot (and registry) and swaps it in.
+    def __init__(self, demand_df):
+        self._models = fit_price_models(demand_df)
+
+    def get(self, fabric_type):
+        return self._models.get(fabric_type)
+
+    def names(self):
+        return list(self._models)
+
+    def __contains__(self, fabric_type):
+        return fabric_type in self._models
+
+    def __len__(self):
+        return len(self._models)
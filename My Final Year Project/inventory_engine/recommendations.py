@@ -0,0 +1,51 @@
+NO_RECOMMENDATIONS = ["No fabric recommendations available."]
+FALLBACK_SEASON = "all-season"
+
+
+def _normalize(value):
+    return (value or "").strip().lower()
+
+
+class RecommendationTable:
+    # Groups demand rows by (season, occasion, budget) once at load time so a
+    # recommendation is a dict lookup rather than three column scans.
+    def __init__(self, demand_df):
+        seasons = demand_df["Season"].astype(str).str.strip().str.lower()
+        occasions = demand_df["Occasion"].astype(str).str.strip().str.lower()
+        budgets = demand_df["Budget Category"].astype(str).str.strip().str.lower()
+
+        groups = {}
+        for key, fabric in zip(zip(seasons, occasions, budgets), demand_df["Fabric Type"]):
+            groups.setdefault(key, []).append(fabric)
+        self._groups = {key: tuple(fabrics) for key, fabrics in groups.items()}
+
+        self.seasons = frozenset(seasons)
+        self.occasions = frozenset(occasions)
+        self.budgets = frozenset(budgets)
+
+    def _resolve(self, season, occasion, budget, fallback):
+        key = (_normalize(season), _normalize(occasion), _normalize(budget))
+        fabrics = self._groups.get(key)
+        if fabrics is None and fallback:
+            fabrics = self._groups.get((FALLBACK_SEASON, key[1], key[2]))
+        return fabrics or ()
+
+    def lookup(self, season, occasion, budget, fallback=True):
+        fabrics = self._resolve(season, occasion, budget, fallback)
+        return list(fabrics) if fabrics else list(NO_RECOMMENDATIONS)
+
+    def count(self, season, occasion, budget, fallback=True):
+        return len(self._resolve(season, occasion, budget, fallback))
+
+    def unknown_keys(self, season, occasion, budget):
+        unknown = []
+        if _normalize(season) not in self.seasons:
+            unknown.append("season")
+        if _normalize(occasion) not in self.occasions:
+            unknown.append("occasion")
+        if _normalize(budget) not in self.budgets:
+            unknown.append("budget")
+        return unknown
+
+    def __len__(self):
+        return len(self._groups)
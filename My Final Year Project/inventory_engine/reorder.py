@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Demand figures in the dataset are per period (taken as a month)
+DEMAND_PERIOD_DAYS = 30
+LEAD_TIME_DAYS = 14
+REVIEW_PERIOD_DAYS = 30
+# z-score for a ~95% service level
+SERVICE_LEVEL_Z = 1.65
+
+DEMAND_COLUMNS = ["Historical Demand", "Current Demand", "Future Demand"]
+
+
+def compute_reorder_plan(stock_df, demand_df, lead_time_days=LEAD_TIME_DAYS,
+                         review_period_days=REVIEW_PERIOD_DAYS, service_level_z=SERVICE_LEVEL_Z,
+                         demand_period_days=DEMAND_PERIOD_DAYS):
+    # One vectorized pass over the whole catalog: joins stock with demand by
+    # fabric and derives, per fabric,
+    #   daily_demand   projected from Future Demand (Current Demand if absent)
+    #   safety_stock   z * daily demand spread * sqrt(lead time)
+    #   reorder_point  lead-time demand + safety stock
+    #   days_of_cover  stock / daily demand
+    #   suggested_order  units to get back up to lead time + review period of cover
+    stock = stock_df[["Fabric Type", "Stock Available"]].drop_duplicates("Fabric Type")
+    demand = demand_df[["Fabric Type"] + DEMAND_COLUMNS].drop_duplicates("Fabric Type")
+    plan = stock.merge(demand, on="Fabric Type", how="inner")
+
+    history = plan[DEMAND_COLUMNS].to_numpy(dtype=np.float64)
+    projected = np.where(np.isnan(history[:, 2]), history[:, 1], history[:, 2])
+    daily_demand = projected / demand_period_days
+    daily_spread = np.nanstd(history, axis=1) / demand_period_days
+
+    stock_level = plan["Stock Available"].to_numpy(dtype=np.float64)
+    safety_stock = service_level_z * daily_spread * np.sqrt(lead_time_days)
+    reorder_point = daily_demand * lead_time_days + safety_stock
+    target_level = daily_demand * (lead_time_days + review_period_days) + safety_stock
+
+    return pd.DataFrame(dict({
+        "fabric_type": plan["Fabric Type"].to_numpy(),
+        "daily_demand": daily_demand,
+        "safety_stock": np.ceil(safety_stock),
+        "reorder_point": np.ceil(reorder_point),
+        # Unrounded, for update_reorder_plan()
+        "reorder_level": reorder_point,
+        "target_level": target_level,
+    }, **_stock_columns(stock_level, daily_demand, reorder_point, target_level))).set_index("fabric_type", drop=False)
+
+
+def update_reorder_plan(plan, fabric_types, stock_levels):
+    # The plan after some fabrics' stock changed. Only the stock-dependent
+    # columns are recomputed, over whole columns at once; the join with
+    # demand and everything derived from it is kept.
+    positions = plan.index.get_indexer(fabric_types)
+    found = positions >= 0
+    if not found.any():
+        return plan
+    stock_level = plan["stock"].to_numpy(dtype=np.float64, copy=True)
+    stock_level[positions[found]] = np.asarray(stock_levels, dtype=np.float64)[found]
+    return plan.assign(**_stock_columns(stock_level, plan["daily_demand"].to_numpy(),
+                                        plan["reorder_level"].to_numpy(), plan["target_level"].to_numpy()))
+
+
+def _stock_columns(stock_level, daily_demand, reorder_point, target_level):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(daily_demand > 0, stock_level / daily_demand, np.inf)
+    return {
+        "stock": stock_level,
+        "days_of_cover": days_of_cover,
+        "suggested_order": np.ceil(np.maximum(target_level - stock_level, 0)),
+        "needs_reorder": stock_level <= reorder_point,
+    }
+
+
+def reorder_suggestions(plan, limit=None):
+    # Fabrics at or below their reorder point, most urgent (least cover) first
+    due = plan[plan["needs_reorder"]].sort_values("days_of_cover", kind="stable")
+    if limit is not None:
+        due = due.head(limit)
+    return [_plan_row(row) for row in due.to_dict("records")]
+
+
+def reorder_status(plan, fabric_type):
+    if fabric_type not in plan.index:
+        return None
+    return _plan_row(plan.loc[fabric_type].to_dict())
+
+
+def _plan_row(row):
+    return {
+        "fabric_type": row["fabric_type"],
+        "stock": int(row["stock"]),
+        "daily_demand": round(float(row["daily_demand"]), 2),
+        "safety_stock": int(row["safety_stock"]),
+        "reorder_point": int(row["reorder_point"]),
+        "days_of_cover": round(float(row["days_of_cover"]), 1) if np.isfinite(row["days_of_cover"]) else None,
+        "suggested_order": int(row["suggested_order"]),
+        "needs_reorder": bool(row["needs_reorder"]),
+    }
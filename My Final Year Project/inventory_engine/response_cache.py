@@ -0,0 +1,99 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Response, make_response, request
+
+DEFAULT_MAX_ENTRIES = 2048
+
+
+def normalized(value):
+    # Key normalizer for inputs the engine lowercases and strips anyway
+    return None if value is None else str(value).strip().lower()
+
+
+def exact(value):
+    # Key normalizer for inputs echoed back verbatim (e.g. in recycling guides)
+    return value
+
+
+class ResponseCache:
+    # Bounded LRU of serialized responses, keyed by their ETag
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return entry
+
+    def put(self, etag, entry):
+        with self._lock:
+            self._entries[etag] = entry
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {"entries": len(self), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+    def metric_families(self):
+        # Collector for MetricsRegistry.register_collector
+        return [
+            ("response_cache_hits_total", "counter", "Lookups served from the response cache.", [({}, self.hits)]),
+            ("response_cache_misses_total", "counter", "Lookups that ran the view.", [({}, self.misses)]),
+            ("response_cache_entries", "gauge", "Responses currently cached.", [({}, len(self))]),
+        ]
+
+
+def cached_response(cache, data_version, **fields):
+    # Caches a read-only view's 200 responses. `fields` maps each request
+    # field (form or query string) the view reads to a key normalizer; the
+    # ETag is a hash of the endpoint, the normalized fields and
+    # data_version(), so it is known before the view runs. A GET/HEAD whose
+    # If-None-Match carries it gets a 304 without touching the cache, and a
+    # new data version (reload, refit) changes every ETag, so entries from
+    # older data are never served again and simply age out of the LRU.
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.endpoint, data_version(),
+                   tuple((name, normalize(request.values.get(name))) for name, normalize in fields.items()))
+            etag = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+            if request.method in ("GET", "HEAD") and etag in request.if_none_match:
+                response = Response(status=304)
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = "no-cache"
+                return response
+
+            entry = cache.get(etag)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = (response.get_data(), response.mimetype)
+                cache.put(etag, entry)
+            body, mimetype = entry
+            response = Response(body, mimetype=mimetype)
+            response.set_etag(etag)
+            # Let clients keep the body but revalidate it on every use
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,229 @@
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+from .fabric_index import normalize_fabric_name
+
+DEFAULT_DB_FILE = "restock_requests.db"
+MAX_QUANTITY = 1_000_000
+MAX_NAME_LENGTH = 100
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class RestockValidationError(ValueError):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+class _Ticket:
+    __slots__ = ("row", "id", "error", "done")
+
+    def __init__(self, row):
+        self.row = row
+        self.id = None
+        self.error = None
+        self.done = False
+
+
+class RestockQueue:
+    # Validated restock requests, persisted to SQLite with group commit.
+    #
+    # Submitting threads only validate and enqueue; one committer thread
+    # writes everything that queued up while the previous transaction was
+    # in flight as a single transaction (one fsync), then wakes the
+    # submitters. Per-fabric totals are kept in the same transaction, so the
+    # aggregated view never needs a scan of the request log.
+    def __init__(self, path=DEFAULT_DB_FILE, catalog=None, legacy_csv=None, max_batch=1000):
+        self.path = path
+        self.catalog = catalog
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._pending = []
+        self._local = threading.local()
+        self.commits = 0
+        self._init_schema(legacy_csv)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _init_schema(self, legacy_csv):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS restock_requests (id INTEGER PRIMARY KEY, fabric_type TEXT NOT NULL, "
+                "requested_by TEXT NOT NULL, email TEXT NOT NULL, quantity INTEGER NOT NULL, requested_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS restock_requests_fabric ON restock_requests (fabric_type)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS restock_totals (fabric_type TEXT PRIMARY KEY, requests INTEGER NOT NULL, "
+                "total_quantity INTEGER NOT NULL, last_requested_at REAL NOT NULL)"
+            )
+            empty = conn.execute("SELECT NOT EXISTS (SELECT 1 FROM restock_requests)").fetchone()[0]
+            if empty and legacy_csv and os.path.exists(legacy_csv):
+                self._import_legacy(conn, legacy_csv)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _import_legacy(self, conn, legacy_csv):
+        # One-time import of the old CSV; rows that fail validation are skipped
+        rows = []
+        skipped = 0
+        with open(legacy_csv, newline="") as f:
+            for record in csv.DictReader(f):
+                try:
+                    rows.append(self.validate({
+                        "fabric_type": record.get("Fabric Type"),
+                        "requested_by": record.get("Requested By"),
+                        "email": record.get("Email"),
+                        "quantity": record.get("Quantity Needed"),
+                    }))
+                except RestockValidationError:
+                    skipped += 1
+        self._insert(conn, rows)
+        print(f"Imported {len(rows)} restock requests from {legacy_csv} ({skipped} invalid rows skipped)")
+
+    def validate(self, request):
+        errors = []
+        fabric_type = normalize_fabric_name(request.get("fabric_type") or "")
+        requested_by = str(request.get("requested_by") or "").strip()
+        email = str(request.get("email") or "").strip()
+        quantity = request.get("quantity")
+
+        if not fabric_type:
+            errors.append("fabric_type is required")
+        elif self.catalog is not None and fabric_type not in self.catalog:
+            errors.append(f"Unknown fabric '{fabric_type}'")
+        if not requested_by:
+            errors.append("requested_by is required")
+        elif len(requested_by) > MAX_NAME_LENGTH:
+            errors.append(f"requested_by must be at most {MAX_NAME_LENGTH} characters")
+        if not EMAIL_PATTERN.match(email):
+            errors.append("email is not a valid address")
+        try:
+            quantity = int(str(quantity).strip())
+            if not 0 < quantity <= MAX_QUANTITY:
+                errors.append(f"quantity must be between 1 and {MAX_QUANTITY}")
+        except ValueError:
+            errors.append("quantity must be a whole number")
+
+        if errors:
+            raise RestockValidationError(errors)
+        return (fabric_type, requested_by, email, quantity, time.time())
+
+    def submit(self, request, timeout=10):
+        return self.submit_many([request], timeout)[0]
+
+    def submit_many(self, requests, timeout=10):
+        # Validates every request first (all or nothing), then blocks until
+        # they are durably committed; returns their ids in order
+        rows = []
+        errors = []
+        for i, request in enumerate(requests):
+            try:
+                rows.append(self.validate(request))
+            except RestockValidationError as e:
+                errors.extend(f"request {i}: {error}" for error in e.errors)
+        if errors:
+            raise RestockValidationError(errors)
+
+        tickets = [_Ticket(row) for row in rows]
+        with self._cond:
+            self._pending.extend(tickets)
+            self._cond.notify_all()
+            if not self._cond.wait_for(lambda: all(ticket.done for ticket in tickets), timeout):
+                raise TimeoutError("Timed out waiting for the restock queue to commit")
+        for ticket in tickets:
+            if ticket.error is not None:
+                raise ticket.error
+        return [ticket.id for ticket in tickets]
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            error = None
+            ids = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                ids = self._insert(conn, [ticket.row for ticket in batch])
+                conn.execute("COMMIT")
+                self.commits += 1
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                error = e
+            with self._cond:
+                for i, ticket in enumerate(batch):
+                    ticket.error = error
+                    ticket.id = ids[i] if error is None else None
+                    ticket.done = True
+                self._cond.notify_all()
+
+    def _insert(self, conn, rows):
+        # Must run inside a write transaction so the new ids are contiguous
+        if not rows:
+            return []
+        first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM restock_requests").fetchone()[0]
+        ids = list(range(first_id, first_id + len(rows)))
+        conn.executemany(
+            "INSERT INTO restock_requests (id, fabric_type, requested_by, email, quantity, requested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(row_id, *row) for row_id, row in zip(ids, rows)],
+        )
+        totals = {}
+        for fabric_type, _, _, quantity, requested_at in rows:
+            count, total, last = totals.get(fabric_type, (0, 0, 0))
+            totals[fabric_type] = (count + 1, total + quantity, max(last, requested_at))
+        conn.executemany(
+            "INSERT INTO restock_totals (fabric_type, requests, total_quantity, last_requested_at) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT(fabric_type) DO UPDATE SET "
+            "requests = requests + excluded.requests, "
+            "total_quantity = total_quantity + excluded.total_quantity, "
+            "last_requested_at = max(last_requested_at, excluded.last_requested_at)",
+            [(fabric_type, *values) for fabric_type, values in totals.items()],
+        )
+        return ids
+
+    def totals(self, fabric_type=None):
+        # Aggregated view per fabric, straight from the maintained totals table
+        query = "SELECT fabric_type, requests, total_quantity, last_requested_at FROM restock_totals"
+        params = ()
+        if fabric_type is not None:
+            query += " WHERE fabric_type = ?"
+            params = (normalize_fabric_name(fabric_type),)
+        rows = self._reader().execute(query + " ORDER BY total_quantity DESC", params).fetchall()
+        return [
+            {"fabric_type": row[0], "requests": row[1], "total_quantity": row[2], "last_requested_at": row[3]}
+            for row in rows
+        ]
+
+    def requests_for(self, fabric_type, limit=100):
+        rows = self._reader().execute(
+            "SELECT id, fabric_type, requested_by, email, quantity, requested_at FROM restock_requests "
+            "WHERE fabric_type = ? ORDER BY id DESC LIMIT ?",
+            (normalize_fabric_name(fabric_type), limit),
+        ).fetchall()
+        columns = ["id", "fabric_type", "requested_by", "email", "quantity", "requested_at"]
+        return [dict(zip(columns, row)) for row in rows]
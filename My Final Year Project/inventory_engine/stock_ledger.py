@@ -0,0 +1,308 @@
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from .data_loader import _file_digest
+from .fabric_index import normalize_fabric_name
+from .metrics import OPERATION_SECONDS, timed
+
+MAX_DELTA = 1_000_000
+# Compaction runs once this many movements are logged, or every
+# COMPACT_INTERVAL seconds while any are
+COMPACT_EVERY = 50_000
+COMPACT_INTERVAL = 60.0
+
+
+class StockAdjustmentError(ValueError):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+class StockLedger:
+    # Stock movements (receipts positive, dispatches negative) against the
+    # engine's stock table, made durable before they are applied.
+    #
+    # A batch is validated as a whole, appended to a write-ahead log (an
+    # SQLite table, one fsync per batch) and only then applied: the engine
+    # swaps in a snapshot with the new levels, so stock lookups, the
+    # inventory summary and the reorder plan see the batch at once.
+    #
+    # Compaction folds the log into the stock CSV. A background thread
+    # writes the CSV with the current levels next to the old one, renames
+    # it into place and drops the movements it contains. The ledger keeps
+    # the SHA-256 of the CSV it wrote, so after a crash it can tell which
+    # movements the CSV on disk already holds (whether or not the rename
+    # happened) and replays exactly the others.
+    def __init__(self, path, engine, compact_every=COMPACT_EVERY, compact_interval=COMPACT_INTERVAL):
+        self.engine = engine
+        self.path = path
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.batches = 0
+        self.movements = 0
+        self.compactions = 0
+        self.last_compaction = None
+        self._init_schema()
+        self._conn = self._connect()
+        self._recover()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stock_movements (seq INTEGER PRIMARY KEY, fabric_type TEXT NOT NULL, "
+            "delta INTEGER NOT NULL, batch INTEGER NOT NULL, recorded_at REAL NOT NULL)"
+        )
+        # 'compacted': the CSV the last finished compaction wrote and the movements it holds;
+        # 'pending': the same for a compaction that may not have renamed its file into place
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stock_files (state TEXT PRIMARY KEY, seq INTEGER NOT NULL, "
+            "sha256 TEXT NOT NULL)"
+        )
+        conn.close()
+
+    def _recover(self):
+        # Replays the movements the stock CSV does not contain yet
+        conn = self._conn
+        files = {state: (seq, digest) for state, seq, digest in conn.execute("SELECT * FROM stock_files")}
+        stock_file = self.engine.snapshot.stock_file
+        digest = _file_digest(stock_file)
+        folded, compacted_digest = files.get("compacted", (0, None))
+        pending = files.get("pending")
+        if pending is not None and pending[1] == digest:
+            # The last compaction renamed its file into place but did not get to record it
+            folded = pending[0]
+            self._finish_compaction(folded, digest)
+        else:
+            if pending is not None:
+                conn.execute("DELETE FROM stock_files WHERE state = 'pending'")
+            if compacted_digest is not None and compacted_digest != digest:
+                print(f"{stock_file} changed since the last compaction; applying the logged movements on top of it")
+        _remove(f"{stock_file}.compacting")
+
+        last = conn.execute("SELECT MAX(seq) FROM stock_movements").fetchone()[0]
+        self.seq = max(last or 0, folded)
+        self.compacted_seq = folded
+        if self.seq > folded:
+            outstanding = dict(conn.execute(
+                "SELECT fabric_type, SUM(delta) FROM stock_movements WHERE seq > ? GROUP BY fabric_type",
+                (folded,)))
+            self.engine.adjust_stock(outstanding, self.seq)
+            print(f"Replayed {self.seq - folded} stock movements from {self.path}")
+
+    def validate(self, movements):
+        # Parses [{"fabric_type": ..., "delta": ...}] or [[fabric_type, delta]]
+        # movements; returns (names, deltas) or raises StockAdjustmentError
+        # listing every invalid one
+        names = []
+        deltas = []
+        errors = []
+        for i, movement in enumerate(movements):
+            if isinstance(movement, dict):
+                name, delta = movement.get("fabric_type"), movement.get("delta")
+            elif isinstance(movement, (list, tuple)) and len(movement) == 2:
+                name, delta = movement
+            else:
+                errors.append(f"movement {i}: expected {{\"fabric_type\", \"delta\"}} or [fabric_type, delta]")
+                continue
+            name = normalize_fabric_name(name) if isinstance(name, str) else ""
+            if not name:
+                errors.append(f"movement {i}: fabric_type is required")
+            if isinstance(delta, bool) or not isinstance(delta, int) or not delta:
+                errors.append(f"movement {i}: delta must be a non-zero whole number")
+            elif abs(delta) > MAX_DELTA:
+                errors.append(f"movement {i}: delta must be at most {MAX_DELTA} either way")
+            names.append(name)
+            deltas.append(delta)
+        if errors:
+            raise StockAdjustmentError(errors)
+        return names, deltas
+
+    @timed(OPERATION_SECONDS, "adjust_stock")
+    def adjust(self, movements):
+        # Applies one batch, all or nothing: every fabric must be in the stock
+        # table and no stock level may drop below zero. Returns the batch's
+        # last movement number and the new level of every fabric it touched.
+        names, deltas = self.validate(movements)
+        if not names:
+            return {"seq": self.seq, "movements": 0, "stock": {}}
+        changes = pd.Series(np.asarray(deltas, dtype=np.int64)).groupby(np.asarray(names, dtype=object),
+                                                                          sort=False).sum()
+        with self._lock:
+            snapshot = self.engine.snapshot
+            rows = snapshot.stock_rows()
+            found = rows.index.get_indexer(changes.index)
+            errors = [f"Unknown fabric '{name}'" for name in changes.index[found < 0]]
+            if not errors:
+                levels = snapshot.stock_df["Stock Available"].to_numpy()[rows.to_numpy()[found]] + changes.to_numpy()
+                errors = [f"Stock of '{name}' would drop to {level}"
+                          for name, level in zip(changes.index[levels < 0], levels[levels < 0])]
+            if errors:
+                raise StockAdjustmentError(errors)
+
+            first = self.seq + 1
+            now = time.time()
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO stock_movements (seq, fabric_type, delta, batch, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                    [(first + i, name, delta, first, now) for i, (name, delta) in enumerate(zip(names, deltas))],
+                )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            self.seq = first + len(names) - 1
+            self.batches += 1
+            self.movements += len(names)
+            snapshot = self.engine.adjust_stock(changes.to_dict(), self.seq)
+        if self.seq - self.compacted_seq >= self.compact_every:
+            self._wake.set()
+        return {
+            "seq": self.seq,
+            "movements": len(names),
+            "stock": {name: snapshot.stock_index.get(name)["Stock Available"] for name in changes.index},
+        }
+
+    def compact(self):
+        # Folds every applied movement into the stock CSV. Returns a report,
+        # or None when there was nothing to fold or the CSV changed on disk
+        # (a hand edit, which the engine reloads with the movements on top;
+        # the next compaction folds them in).
+        with self._compact_lock:
+            checkpoint = self.engine.stock_checkpoint()
+            snapshot, _, seq = checkpoint
+            if seq <= self.compacted_seq:
+                return None
+            started = time.perf_counter()
+            stock_file = snapshot.stock_file
+            new_file = f"{stock_file}.compacting"
+            try:
+                write_stock_file(stock_file, snapshot.stock_df, new_file)
+            except (OSError, ValueError) as e:
+                _remove(new_file)
+                print(f"Stock compaction skipped: {e}")
+                return None
+            digest = _file_digest(new_file)
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO stock_files VALUES ('pending', ?, ?)", (seq, digest))
+            if not self.engine.replace_stock_file(new_file, checkpoint):
+                _remove(new_file)
+                with self._lock:
+                    self._conn.execute("DELETE FROM stock_files WHERE state = 'pending'")
+                return None
+            _fsync_directory(stock_file)
+            with self._lock:
+                self._finish_compaction(seq, digest)
+            self.compacted_seq = seq
+            self.compactions += 1
+            self.last_compaction = {"seq": seq, "at": time.time(), "seconds": round(time.perf_counter() - started, 4)}
+            return self.last_compaction
+
+    def _finish_compaction(self, seq, digest):
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM stock_movements WHERE seq <= ?", (seq,))
+            conn.execute("INSERT OR REPLACE INTO stock_files VALUES ('compacted', ?, ?)", (seq, digest))
+            conn.execute("DELETE FROM stock_files WHERE state = 'pending'")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self, compact=True):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if compact:
+            self.compact()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.compact_interval)
+            self._wake.clear()
+            if self._stopping.is_set() or self.seq <= self.compacted_seq:
+                continue
+            try:
+                self.compact()
+            except Exception as e:
+                # The movements stay in the log; the next round tries again
+                print(f"Stock compaction failed: {e}")
+
+    def status(self):
+        return {
+            "seq": self.seq,
+            "compacted_seq": self.compacted_seq,
+            "uncompacted": self.seq - self.compacted_seq,
+            "batches": self.batches,
+            "movements": self.movements,
+            "compactions": self.compactions,
+            "last_compaction": self.last_compaction,
+        }
+
+    def metric_families(self):
+        # Collector for MetricsRegistry.register_collector
+        return [
+            ("stock_adjust_batches_total", "counter", "Stock movement batches applied.", [({}, self.batches)]),
+            ("stock_movements_total", "counter", "Stock movements applied.", [({}, self.movements)]),
+            ("stock_compactions_total", "counter", "Compactions of the movement log into the stock file.",
+             [({}, self.compactions)]),
+            ("stock_uncompacted_movements", "gauge", "Logged movements not yet in the stock file.",
+             [({}, self.seq - self.compacted_seq)]),
+        ]
+
+
+def write_stock_file(path, stock_df, new_path):
+    # Writes the stock CSV at `path` to `new_path` with the levels of
+    # stock_df, which must have been loaded from it. Every other cell, the
+    # header and the whitespace around values stay as they are.
+    raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+    column = next((name for name in raw.columns if name.strip() == "Stock Available"), None)
+    if column is None or len(raw) != len(stock_df):
+        raise ValueError(f"{path} no longer matches the loaded stock table")
+    leading = raw[column].str.extract(r"^(\s*)", expand=False)
+    raw[column] = leading + stock_df["Stock Available"].astype(str).to_numpy()
+    with open(new_path, "w", newline="") as f:
+        raw.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _fsync_directory(path):
+    # Makes a rename durable; Windows has no directory handles to sync (nor the need)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,69 @@
+import argparse
+import os
+import random
+import time
+import tty
+from sensors.parser import encode_binary_frame
+
+
+def open_pty():
+    # Returns (master fd, slave fd, slave path); the app opens the slave path like a serial port
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    os.set_blocking(master, False)
+    path = os.ttyname(slave)
+    return master, slave, path
+
+
+def encode_frame(frame_format, temperature, humidity, mq3_value, ldr_value):
+    if frame_format == "binary":
+        return encode_binary_frame(temperature, humidity, mq3_value, ldr_value)
+    if frame_format == "csv":
+        return f"{temperature:.2f},{humidity:.2f},{mq3_value},{ldr_value}\r\n".encode()
+    return f"Temp: {temperature:.2f} C, Hum: {humidity:.2f} %, MQ-3: {mq3_value}, LDR: {ldr_value}\r\n".encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Emulate Arduino sensor boards on pseudo-terminals (POSIX only), for running ss.py without hardware.")
+    parser.add_argument("--devices", type=int, default=1, help="number of boards to emulate")
+    parser.add_argument("--rate", type=float, default=1.0, help="readings per second per board")
+    parser.add_argument("--format", choices=["text", "csv", "binary"], default="text",
+                        help="line format the emulated firmware sends")
+    parser.add_argument("--seconds", type=float, default=None, help="stop after this long (default: run until Ctrl+C)")
+    args = parser.parse_args()
+
+    boards = []
+    for i in range(args.devices):
+        master, slave, path = open_pty()
+        boards.append({"name": f"board{i + 1}", "master": master, "slave": slave, "path": path,
+                       "temperature": 25.0, "humidity": 60.0})
+    ports = ",".join(f"{board['name']}={board['path']}" for board in boards)
+    print(f"Emulating {len(boards)} board(s). Start the dashboard with:")
+    print(f"  ARDUINO_PORTS={ports} python ss.py")
+
+    interval = 1.0 / args.rate
+    deadline = None if args.seconds is None else time.monotonic() + args.seconds
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            for board in boards:
+                board["temperature"] += random.uniform(-0.2, 0.2)
+                board["humidity"] = min(100.0, max(0.0, board["humidity"] + random.uniform(-0.5, 0.5)))
+                frame = encode_frame(args.format, board["temperature"], board["humidity"],
+                                     random.randint(350, 450), random.randint(250, 350))
+                try:
+                    os.write(board["master"], frame)
+                except BlockingIOError:
+                    # Nobody is reading this board; drop the reading like a real UART would
+                    pass
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Simulator stopped by user.")
+    finally:
+        for board in boards:
+            os.close(board["master"])
+            os.close(board["slave"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+from .alerts import AlertEngine, AlertRule, load_alert_rules, rules_from_config
+from .broadcast import SensorBroadcaster
+from .ingest import SerialIngestor
+from .parser import FrameReader, encode_binary_frame, parse_binary_frame, parse_line
+from .ring_buffer import SENSOR_FIELDS, SensorRingBuffer, rows_to_dicts
+from .store import SensorStore
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+from collections import deque
+from .ring_buffer import METRIC_FIELDS
+
+ALERT_RULES_FILE = "alert_rules.json"
+
+# Environmental alarms from the project brief: heat and smoke (fire risk)
+# and damp air (fabric damage). Overridden by alert_rules.json if present.
+DEFAULT_ALERT_RULES = [
+    {"name": "high_temperature", "metric": "temperature", "above": 45, "hysteresis": 2, "samples": 3,
+     "severity": "critical"},
+    {"name": "rapid_temperature_rise", "metric": "temperature", "type": "rate", "above": 0.5, "hysteresis": 0.2,
+     "samples": 3, "severity": "critical"},
+    {"name": "high_humidity", "metric": "humidity", "above": 70, "hysteresis": 5, "samples": 5,
+     "severity": "warning"},
+    {"name": "smoke_detected", "metric": "mq3_value", "above": 600, "hysteresis": 50, "samples": 3,
+     "severity": "critical"},
+]
+
+
+class AlertRule:
+    # Fires when the measured value goes above `above` (or below `below`)
+    # for `samples` consecutive readings, and clears only once it is back
+    # inside the limit by more than `hysteresis` for as many readings.
+    # The measured value is the reading itself, or its change per second
+    # for rate rules.
+    __slots__ = ("name", "metric", "index", "rate", "above", "below", "hysteresis", "samples", "severity")
+
+    def __init__(self, name, metric, above=None, below=None, hysteresis=0.0, samples=1,
+                 severity="warning", rate=False):
+        if metric not in METRIC_FIELDS:
+            raise ValueError(f"Unknown metric '{metric}' in alert rule '{name}'")
+        if (above is None) == (below is None):
+            raise ValueError(f"Alert rule '{name}' needs exactly one of above/below")
+        if samples < 1:
+            raise ValueError(f"Alert rule '{name}' needs samples >= 1")
+        self.name = name
+        self.metric = metric
+        self.index = METRIC_FIELDS.index(metric)
+        self.rate = rate
+        self.above = above
+        self.below = below
+        self.hysteresis = hysteresis
+        self.samples = samples
+        self.severity = severity
+
+    @property
+    def threshold(self):
+        return self.above if self.above is not None else self.below
+
+    def update(self, state, timestamp, value):
+        # Advances one device's state; returns True when the alert was
+        # raised or cleared by this reading
+        if self.rate:
+            previous, previous_time = state.previous, state.previous_time
+            state.previous, state.previous_time = value, timestamp
+            if previous is None or timestamp <= previous_time:
+                return False
+            value = (value - previous) / (timestamp - previous_time)
+        state.value = value
+
+        if self.above is not None:
+            breach = value > self.above
+            clear = value < self.above - self.hysteresis
+        else:
+            breach = value < self.below
+            clear = value > self.below + self.hysteresis
+
+        if clear if state.active else breach:
+            state.count += 1
+            if state.count >= self.samples:
+                state.active = not state.active
+                state.count = 0
+                state.since = timestamp
+                return True
+        else:
+            state.count = 0
+        return False
+
+
+class _RuleState:
+    __slots__ = ("active", "count", "since", "value", "previous", "previous_time")
+
+    def __init__(self):
+        self.active = False
+        self.count = 0
+        self.since = None
+        self.value = None
+        self.previous = None
+        self.previous_time = None
+
+
+def rules_from_config(config):
+    rules = []
+    for item in config:
+        item = dict(item)
+        kind = item.pop("type", "threshold")
+        if kind not in ("threshold", "rate"):
+            raise ValueError(f"Unknown alert rule type '{kind}'")
+        rules.append(AlertRule(rate=kind == "rate", **item))
+    return rules
+
+
+def load_alert_rules(path=ALERT_RULES_FILE):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return rules_from_config(json.load(f))
+    return rules_from_config(DEFAULT_ALERT_RULES)
+
+
+class AlertEngine:
+    # Evaluates every rule against every reading, inline in the serial
+    # pipeline. Each reading costs one pass over the rules and touches only
+    # preallocated per-device state; an alert object is built only when a
+    # rule changes state. Hysteresis and the consecutive-sample debounce
+    # mean a burst of out-of-range readings produces one "raised" and one
+    # "cleared" notification, not one per reading.
+    def __init__(self, rules, history=200):
+        self.rules = list(rules)
+        self._states = {}
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        self._active = {}
+        self._subscribers = []
+        self._seq = 0
+
+    def evaluate(self, device, timestamp, temperature, humidity, mq3_value, ldr_value):
+        states = self._states.get(device)
+        if states is None:
+            states = self._states[device] = [_RuleState() for _ in self.rules]
+        values = (temperature, humidity, mq3_value, ldr_value)
+        for rule, state in zip(self.rules, states):
+            if rule.update(state, timestamp, values[rule.index]):
+                self._emit(rule, state, device, timestamp)
+
+    def _emit(self, rule, state, device, timestamp):
+        with self._lock:
+            self._seq += 1
+            alert = {
+                "seq": self._seq,
+                "rule": rule.name,
+                "device": device,
+                "metric": rule.metric,
+                "severity": rule.severity,
+                "state": "raised" if state.active else "cleared",
+                "value": state.value,
+                "threshold": rule.threshold,
+                "rate": rule.rate,
+                "timestamp": timestamp,
+            }
+            self._recent.append(alert)
+            if state.active:
+                self._active[(rule.name, device)] = alert
+            else:
+                self._active.pop((rule.name, device), None)
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(alert)
+            except Exception as e:
+                print(f"Alert subscriber {callback!r} failed: {e}")
+
+    def subscribe(self, callback):
+        # Calls callback(alert) on every raise/clear, from the serial
+        # thread; returns a function that unsubscribes it
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def active(self):
+        with self._lock:
+            return list(self._active.values())
+
+    def recent(self, since=0, limit=None):
+        # Alerts with seq > since, oldest first
+        with self._lock:
+            alerts = [alert for alert in self._recent if alert["seq"] > since]
+        if limit is not None:
+            alerts = alerts[max(0, len(alerts) - limit):]
+        return alerts
+
+    @property
+    def last_seq(self):
+        return self._seq
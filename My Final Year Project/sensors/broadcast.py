@@ -0,0 +1,44 @@
+import threading
+
+
+class SensorBroadcaster:
+    # Fans the latest reading out from one producer to any number of
+    # streaming clients. Subscribers wait on a shared condition and always
+    # jump to the newest reading, so a slow client skips samples instead of
+    # queueing them.
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._latest = None
+        self.subscribers = 0
+
+    def publish(self, message):
+        with self._cond:
+            self._latest = message
+            self._seq += 1
+            self._cond.notify_all()
+
+    def latest(self):
+        return self._latest
+
+    def wait(self, last_seq, timeout=None):
+        # Blocks until something newer than last_seq is published; returns
+        # (seq, message), or (last_seq, None) when the timeout expires first
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != last_seq, timeout):
+                return last_seq, None
+            return self._seq, self._latest
+
+    def subscribe(self, keepalive=15):
+        # Yields each message published after subscribing, or None after
+        # every `keepalive` seconds of silence
+        with self._cond:
+            self.subscribers += 1
+            seq = self._seq
+        try:
+            while True:
+                seq, message = self.wait(seq, keepalive)
+                yield message
+        finally:
+            with self._cond:
+                self.subscribers -= 1
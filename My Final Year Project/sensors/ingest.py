@@ -0,0 +1,192 @@
+import selectors
+import threading
+import time
+import serial
+from .parser import FrameReader, parse_line
+
+DEFAULT_BAUD_RATE = 9600
+
+
+class SerialDevice:
+    # Connection state of one sensor board
+    def __init__(self, name, port, parse=parse_line):
+        self.name = name
+        self.port = port
+        self.serial = None
+        self.reader = FrameReader(parse)
+        self.selectable = False
+        self.connected = False
+        self.readings = 0
+        # Readings whose on_reading callback raised
+        self.failed_readings = 0
+        self.connects = 0
+        self.last_reading_at = None
+        self.last_error = None
+        self.backoff = 0
+        self.retry_at = 0
+
+    def status(self):
+        return {
+            "device": self.name,
+            "port": self.port,
+            "connected": self.connected,
+            "readings": self.readings,
+            "bad_lines": self.reader.bad_frames,
+            "failed_readings": self.failed_readings,
+            "reconnects": max(0, self.connects - 1),
+            "last_reading_at": self.last_reading_at,
+            "last_error": self.last_error,
+            "retry_in": None if self.connected else max(0.0, round(self.retry_at - time.monotonic(), 1)),
+        }
+
+
+class SerialIngestor:
+    # Reads any number of serial ports (or pseudo-terminals) from one thread.
+    #
+    # Ports with a file descriptor (POSIX serial devices, ptys) are
+    # multiplexed with a selector; ports without one (Windows COM ports) are
+    # polled with in_waiting every poll_interval. A port that fails to open
+    # or drops out is retried with exponential backoff, so unplugging a board
+    # no longer stops ingestion for good. Every parsed reading (text line,
+    # CSV line or binary frame, see sensors.parser) goes to
+    # on_reading(device, timestamp, temperature, humidity, mq3_value,
+    # ldr_value) and every connect/disconnect to on_status(device, connected),
+    # both called from the ingest thread. A callback that raises is logged
+    # and costs only that reading or status change.
+    def __init__(self, ports, on_reading, on_status=None, baud_rate=DEFAULT_BAUD_RATE,
+                 parse=parse_line, min_backoff=1.0, max_backoff=30.0, poll_interval=0.05):
+        # `ports` is a list of port names or a {device name: port} dict
+        if not isinstance(ports, dict):
+            ports = {port: port for port in ports}
+        self.devices = [SerialDevice(name, port, parse) for name, port in ports.items()]
+        self.on_reading = on_reading
+        self.on_status = on_status
+        self.baud_rate = baud_rate
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self._selector = selectors.DefaultSelector()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def connected(self):
+        return any(device.connected for device in self.devices)
+
+    def status(self):
+        return [device.status() for device in self.devices]
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                now = time.monotonic()
+                for device in self.devices:
+                    if not device.connected and now >= device.retry_at:
+                        self._open(device)
+
+                polled = [device for device in self.devices if device.connected and not device.selectable]
+                timeout = self.poll_interval if polled else 0.5
+                waiting = [device.retry_at for device in self.devices if not device.connected]
+                if waiting:
+                    timeout = max(0.0, min(timeout, min(waiting) - time.monotonic()))
+
+                if self._selector.get_map():
+                    for key, _ in self._selector.select(timeout):
+                        self._read(key.data)
+                else:
+                    self._stopping.wait(timeout)
+                for device in polled:
+                    if device.connected:
+                        self._read(device)
+        finally:
+            for device in self.devices:
+                if device.connected:
+                    self._close(device, None)
+            self._selector.close()
+
+    def _open(self, device):
+        try:
+            device.serial = serial.Serial(device.port, self.baud_rate, timeout=0)
+        except (serial.SerialException, OSError, ValueError) as e:
+            if device.last_error is None:
+                print(f"Error opening serial port {device.port} ({device.name}): {e}")
+            self._schedule_retry(device, e)
+            return
+        try:
+            self._selector.register(device.serial.fileno(), selectors.EVENT_READ, device)
+            device.selectable = True
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            device.selectable = False
+        device.connects += 1
+        device.connected = True
+        device.backoff = 0
+        device.last_error = None
+        device.reader.clear()
+        print(f"Connected to {device.port} ({device.name}) at {self.baud_rate} baud rate.")
+        self._notify_status(device, True)
+
+    def _close(self, device, error):
+        if device.selectable:
+            try:
+                self._selector.unregister(device.serial.fileno())
+            except (KeyError, OSError, ValueError):
+                pass
+        try:
+            device.serial.close()
+        except (serial.SerialException, OSError):
+            pass
+        device.serial = None
+        device.connected = False
+        device.selectable = False
+        if error is not None:
+            print(f"Lost connection to {device.port} ({device.name}): {error}")
+            self._schedule_retry(device, error)
+        self._notify_status(device, False)
+
+    def _notify_status(self, device, connected):
+        if self.on_status is None:
+            return
+        try:
+            self.on_status(device.name, connected)
+        except Exception as e:
+            print(f"Status callback failed for {device.name}: {e!r}")
+
+    def _schedule_retry(self, device, error):
+        device.last_error = str(error)
+        device.backoff = min(self.max_backoff, device.backoff * 2 or self.min_backoff)
+        device.retry_at = time.monotonic() + device.backoff
+
+    def _read(self, device):
+        try:
+            waiting = device.serial.in_waiting
+            if not waiting and not device.selectable:
+                return
+            data = device.serial.read(waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            self._close(device, e)
+            return
+        if not data:
+            return
+        readings = device.reader.feed(data)
+        if not readings:
+            return
+        timestamp = time.time()
+        device.readings += len(readings)
+        device.last_reading_at = timestamp
+        for values in readings:
+            try:
+                self.on_reading(device.name, timestamp, *values)
+            except Exception as e:
+                device.failed_readings += 1
+                print(f"Reading callback failed for {device.name}: {e!r}")
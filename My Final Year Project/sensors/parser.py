@@ -0,0 +1,144 @@
+import struct
+
+# Text line sent by the current firmware:
+#   Temp: 25.00 C, Hum: 60.00 %, MQ-3: 400, LDR: 300
+# and the compact CSV form:
+#   25.00,60.00,400,300
+# One translate() call blanks out everything but the number characters and
+# turns ':' into ',' (float() and int() accept the padding), so a text line
+# splits into label, value, label, value, ... fields straight from the
+# readline() bytes, with no decoding, stripping or unit replacing. As before,
+# labels are located by position only and extra trailing fields are ignored.
+_KEEP = frozenset(b"0123456789.-+,")
+_NUMERIC = bytes(c if c in _KEEP else 0x2C if c == 0x3A else 0x20 for c in range(256))
+
+# Binary frame: sync bytes, temperature and humidity in hundredths, MQ-3 and
+# LDR raw values, then an XOR checksum of the 8 payload bytes. The sync bytes
+# are not ASCII, so frames can be mixed with text lines on the same port.
+BINARY_SYNC = b"\xaa\x55"
+BINARY_FRAME = struct.Struct("<2shhHHB")
+_PAYLOAD = struct.Struct("<2xQ")
+
+
+def parse_line(line):
+    # Parses one text or CSV line (bytes, or str for old callers) into
+    # (temperature, humidity, mq3_value, ldr_value); None if it is not a reading
+    if isinstance(line, str):
+        line = line.encode("utf-8", errors="replace")
+    parts = line.translate(_NUMERIC).split(b",")
+    try:
+        if b":" in line:
+            if len(parts) < 8:
+                return None
+            return float(parts[1]), float(parts[3]), int(parts[5]), int(parts[7])
+        if len(parts) < 4:
+            return None
+        return float(parts[0]), float(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        # A field that is empty or not a number (only happens on corrupt lines)
+        return None
+
+
+def _fold_xor(value):
+    # XOR of the 8 bytes packed little-endian into `value`
+    value ^= value >> 32
+    value ^= value >> 16
+    value ^= value >> 8
+    return value & 0xFF
+
+
+def _checksum(payload):
+    return _fold_xor(int.from_bytes(payload, "little"))
+
+
+def encode_binary_frame(temperature, humidity, mq3_value, ldr_value):
+    # Reference encoder for the firmware side (and the simulator)
+    payload = struct.pack("<hhHH", round(temperature * 100), round(humidity * 100), mq3_value, ldr_value)
+    return BINARY_SYNC + payload + bytes([_checksum(payload)])
+
+
+def parse_binary_frame(frame, offset=0):
+    # Decodes the frame starting at `offset` in any bytes-like buffer, without copying it
+    sync, temperature, humidity, mq3_value, ldr_value, checksum = BINARY_FRAME.unpack_from(frame, offset)
+    if sync != BINARY_SYNC or checksum != _fold_xor(_PAYLOAD.unpack_from(frame, offset)[0]):
+        return None
+    return temperature / 100, humidity / 100, mq3_value, ldr_value
+
+
+class FrameReader:
+    # Splits the byte stream from one port into readings. Handles newline-
+    # terminated text/CSV lines and fixed-size binary frames, which may
+    # arrive split across reads.
+    def __init__(self, parse=parse_line, max_line_length=4096):
+        self.parse = parse
+        self.max_line_length = max_line_length
+        self.buffer = bytearray()
+        self.bad_frames = 0
+
+    def clear(self):
+        self.buffer.clear()
+
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        if BINARY_SYNC[0] not in buffer:
+            return self._feed_text()
+        readings = []
+        start = 0
+        size = len(buffer)
+        while start < size:
+            if buffer.startswith(BINARY_SYNC, start):
+                end = start + BINARY_FRAME.size
+                if end > size:
+                    break
+                values = parse_binary_frame(buffer, start)
+                if values is None:
+                    # Not a real frame start: skip the sync byte and resync
+                    self.bad_frames += 1
+                    start += 1
+                    continue
+                readings.append(values)
+                start = end
+                continue
+            end = buffer.find(b"\n", start)
+            sync = buffer.find(BINARY_SYNC, start, end if end >= 0 else size)
+            if sync >= 0:
+                # Text noise in front of a binary frame
+                self._line(buffer[start:sync], readings)
+                start = sync
+                continue
+            if end < 0:
+                break
+            self._line(buffer[start:end], readings)
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > self.max_line_length:
+            # No frame boundary in sight: drop the garbage rather than grow forever
+            self.bad_frames += 1
+            buffer.clear()
+        return readings
+
+    def _feed_text(self):
+        # Fast path for text-only data: split every complete line at once
+        buffer = self.buffer
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            if len(buffer) > self.max_line_length:
+                self.bad_frames += 1
+                buffer.clear()
+            return []
+        lines = bytes(buffer[:end]).split(b"\n")
+        del buffer[:end + 1]
+        readings = []
+        for line in lines:
+            self._line(line, readings)
+        return readings
+
+    def _line(self, line, readings):
+        if not line.strip():
+            return
+        values = self.parse(line)
+        if values is None:
+            self.bad_frames += 1
+        else:
+            readings.append(values)
@@ -0,0 +1,103 @@
+import time
+import numpy as np
+
+SENSOR_FIELDS = ["timestamp", "temperature", "humidity", "mq3_value", "ldr_value"]
+METRIC_FIELDS = SENSOR_FIELDS[1:]
+DEFAULT_CAPACITY = 3600
+
+
+class SensorRingBuffer:
+    # Fixed-size, array-backed history of sensor readings.
+    #
+    # There is one writer (the serial thread). It fills a slot and only then
+    # publishes it by bumping the counter, so readers never take a lock: they
+    # copy the slots they want and drop any that the writer overwrote while
+    # they were copying. The slot being written next is never trusted, so a
+    # full buffer exposes capacity - 1 readings.
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self.capacity = capacity
+        self._data = np.zeros((capacity, len(SENSOR_FIELDS)), dtype=np.float64)
+        self._count = 0
+
+    def append(self, timestamp, temperature, humidity, mq3_value, ldr_value):
+        row = self._data[self._count % self.capacity]
+        row[0] = timestamp
+        row[1] = temperature
+        row[2] = humidity
+        row[3] = mq3_value
+        row[4] = ldr_value
+        self._count += 1
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def total(self):
+        # Number of readings ever appended, including overwritten ones
+        return self._count
+
+    def latest(self):
+        count = self._count
+        if count == 0:
+            return None
+        row = self._data[(count - 1) % self.capacity].copy()
+        if self._count - (count - 1) >= self.capacity:
+            return self.latest()
+        return _row_to_dict(row)
+
+    def snapshot(self, last=None):
+        # Returns up to `last` most recent readings, oldest first, as an
+        # (n, 5) array in SENSOR_FIELDS column order
+        end = self._count
+        size = min(end, self.capacity)
+        if last is not None:
+            size = min(size, last)
+        start = end - size
+        first = start % self.capacity
+        if first + size <= self.capacity:
+            rows = self._data[first:first + size].copy()
+        else:
+            rows = np.concatenate((self._data[first:], self._data[:(first + size) - self.capacity]))
+        # Slots below this sequence number may have been rewritten mid-copy
+        overwritten = self._count - self.capacity + 1
+        if overwritten > start:
+            rows = rows[min(overwritten - start, size):]
+        return rows
+
+    def window(self, seconds, now=None):
+        if now is None:
+            now = time.time()
+        rows = self.snapshot()
+        cutoff = np.searchsorted(rows[:, 0], now - seconds, side="left")
+        return rows[cutoff:]
+
+    def stats(self, seconds, now=None):
+        rows = self.window(seconds, now)
+        summary = {"count": len(rows), "seconds": seconds}
+        for i, field in enumerate(METRIC_FIELDS, start=1):
+            if len(rows):
+                column = rows[:, i]
+                summary[field] = {
+                    "min": float(column.min()),
+                    "mean": float(column.mean()),
+                    "max": float(column.max()),
+                }
+            else:
+                summary[field] = None
+        return summary
+
+
+def _row_to_dict(row):
+    return {
+        "timestamp": float(row[0]),
+        "temperature": float(row[1]),
+        "humidity": float(row[2]),
+        "mq3_value": int(row[3]),
+        "ldr_value": int(row[4]),
+    }
+
+
+def rows_to_dicts(rows):
+    return [_row_to_dict(row) for row in rows]
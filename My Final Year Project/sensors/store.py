@@ -0,0 +1,309 @@
+import queue
+import sqlite3
+import threading
+import time
+from .ring_buffer import METRIC_FIELDS
+
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+DEFAULT_DB_FILE = "sensor_history.db"
+# Rows fetched from SQLite at a time by export()
+EXPORT_BATCH = 5000
+# Readings waiting for the writer; past this, add() drops new ones (about
+# half an hour of one board at 50 Hz), so a stuck database cannot grow the
+# queue without bound
+MAX_PENDING = 100000
+# Tries per batch when SQLite fails (locked, disk full), then the batch is dropped
+WRITE_ATTEMPTS = 3
+RETRY_DELAY = 1.0
+
+
+class SensorStore:
+    # Persists sensor readings to SQLite (WAL mode) from a background thread.
+    #
+    # add() only puts the reading on an in-memory queue, so the serial reader
+    # never waits on disk. The writer drains the queue in batches, inserts
+    # the raw samples and folds each batch into per-minute and per-hour
+    # min/sum/max rollups, which range queries read instead of raw rows.
+    # Readings that cannot be queued or written are counted in `dropped`.
+    def __init__(self, path=DEFAULT_DB_FILE, flush_interval=1.0, batch_size=500,
+                 raw_retention=7 * 24 * 3600, max_pending=MAX_PENDING):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.raw_retention = raw_retention
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+        self._thread = None
+        self._stopping = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self._init_schema()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        metrics = ", ".join(f"{field} REAL" for field in METRIC_FIELDS)
+        aggregates = ", ".join(
+            f"{field}_min REAL, {field}_sum REAL, {field}_max REAL" for field in METRIC_FIELDS
+        )
+        with conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS readings (timestamp REAL NOT NULL, {metrics}, device TEXT)")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(readings)")]
+            if "device" not in columns:
+                # Databases from before readings were tagged by device
+                conn.execute("ALTER TABLE readings ADD COLUMN device TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS readings_timestamp ON readings (timestamp)")
+            for name in RESOLUTIONS:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS rollup_{name} "
+                    f"(bucket INTEGER PRIMARY KEY, count INTEGER NOT NULL, {aggregates})"
+                )
+        conn.close()
+
+    def add(self, timestamp, temperature, humidity, mq3_value, ldr_value, device=None):
+        try:
+            self._queue.put_nowait((timestamp, temperature, humidity, mq3_value, ldr_value, device))
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        conn = self._connect()
+        last_prune = 0
+        try:
+            while not self._stopping.is_set() or not self._queue.empty():
+                batch = self._drain()
+                if batch:
+                    self._write_batch(conn, batch)
+                if self.raw_retention and time.time() - last_prune > 3600:
+                    try:
+                        with conn:
+                            conn.execute("DELETE FROM readings WHERE timestamp < ?",
+                                         (time.time() - self.raw_retention,))
+                    except sqlite3.Error as e:
+                        self.write_errors += 1
+                        print(f"Pruning sensor history failed: {e}")
+                    last_prune = time.time()
+        finally:
+            conn.close()
+
+    def _drain(self):
+        # Waits for the first reading, then collects whatever else arrives
+        # within the flush interval, up to batch_size
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, conn, batch):
+        # An error rolls the batch back; it is tried again a few times (the
+        # queue absorbs new readings meanwhile) and then dropped, so one bad
+        # moment of the disk does not stop the writer
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                self._write(conn, batch)
+                return
+            except sqlite3.Error as e:
+                self.write_errors += 1
+                print(f"Writing {len(batch)} sensor readings failed (attempt {attempt} of {WRITE_ATTEMPTS}): {e}")
+            if attempt < WRITE_ATTEMPTS:
+                self._stopping.wait(RETRY_DELAY)
+        self.dropped += len(batch)
+
+    def _write(self, conn, batch):
+        with conn:
+            conn.executemany(_INSERT_SQL, batch)
+            for name, width in RESOLUTIONS.items():
+                conn.executemany(_UPSERT_SQL[name], _rollup(batch, width))
+        self.written += len(batch)
+
+    def metric_families(self):
+        # Collector for MetricsRegistry.register_collector
+        return [
+            ("sensor_store_written_total", "counter", "Readings written to the sensor history.",
+             [({}, self.written)]),
+            ("sensor_store_dropped_total", "counter", "Readings dropped: queue full or batch failed to write.",
+             [({}, self.dropped)]),
+            ("sensor_store_write_errors_total", "counter", "Failed sensor history writes, including retries.",
+             [({}, self.write_errors)]),
+            ("sensor_store_pending", "gauge", "Readings queued for the writer.", [({}, self._queue.qsize())]),
+        ]
+
+    def history(self, start, end, resolution="auto", device=None):
+        # Returns {"resolution", "points"} for readings in [start, end).
+        # "auto" picks the coarsest resolution that still gives detail.
+        # Rollups cover all devices; `device` filters raw readings only.
+        if resolution == "auto":
+            span = end - start
+            resolution = "raw" if span <= 3600 else "minute" if span <= 2 * 86400 else "hour"
+        if resolution == "raw":
+            fields = ["timestamp"] + METRIC_FIELDS + ["device"]
+            query = f"SELECT {', '.join(fields)} FROM readings WHERE timestamp >= ? AND timestamp < ?"
+            params = (start, end)
+            if device is not None:
+                query += " AND device = ?"
+                params += (device,)
+            rows = self._reader().execute(query + " ORDER BY timestamp", params).fetchall()
+            points = [dict(zip(fields, row)) for row in rows]
+            return {"resolution": resolution, "points": points}
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}'")
+        width = RESOLUTIONS[resolution]
+        rows = self._reader().execute(
+            f"SELECT * FROM rollup_{resolution} WHERE bucket >= ? AND bucket < ? ORDER BY bucket",
+            (int(start // width) * width, end),
+        ).fetchall()
+        points = []
+        for row in rows:
+            point = {"timestamp": row[0], "count": row[1]}
+            for i, field in enumerate(METRIC_FIELDS):
+                low, total, high = row[2 + 3 * i:5 + 3 * i]
+                point[field] = {"min": low, "mean": total / row[1], "max": high}
+            points.append(point)
+        return {"resolution": resolution, "points": points}
+
+    def export_columns(self, resolution="raw"):
+        # (name, kind) of the rows export() yields; kind is int, float or str
+        if resolution == "raw":
+            return [("id", "int"), ("timestamp", "float")] + [(field, "float") for field in METRIC_FIELDS] + \
+                [("device", "str")]
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}'")
+        return [("timestamp", "int"), ("count", "int")] + [
+            (f"{field}_{stat}", "float") for field in METRIC_FIELDS for stat in ("min", "mean", "max")
+        ]
+
+    def export(self, start, end, resolution="raw", device=None, after=None, limit=None, batch_size=EXPORT_BATCH):
+        # Readings (or rollup buckets) in [start, end) for bulk export, in
+        # (timestamp, id) order. Returns (next key, batches): batches yields
+        # lists of at most batch_size row tuples (see export_columns) from
+        # its own connection, so an export of any length holds one batch at
+        # a time. Pages resume after the key of the previous page's last row;
+        # with a limit, the next key is that of this page's last row, or
+        # None when no rows follow it.
+        if resolution == "raw":
+            fields = ["rowid", "timestamp"] + METRIC_FIELDS + ["device"]
+            key = ["timestamp", "rowid"]
+            where = ["timestamp >= ?", "timestamp < ?"]
+            params = [start, end]
+            if after:
+                where.append("(timestamp > ? OR (timestamp = ? AND rowid > ?))")
+                params += [after[0], after[0], after[1]]
+            if device is not None:
+                where.append("device = ?")
+                params.append(device)
+            table = "readings"
+        elif resolution in RESOLUTIONS:
+            width = RESOLUTIONS[resolution]
+            fields = ["bucket", "count"] + [
+                f"{field}_sum / count" if stat == "mean" else f"{field}_{stat}"
+                for field in METRIC_FIELDS for stat in ("min", "mean", "max")
+            ]
+            key = ["bucket"]
+            where = ["bucket >= ?", "bucket < ?"]
+            params = [int(start // width) * width, end]
+            if after:
+                where.append("bucket > ?")
+                params.append(after[0])
+            table = f"rollup_{resolution}"
+        else:
+            raise ValueError(f"Unknown resolution '{resolution}'")
+        query = f"FROM {table} WHERE {' AND '.join(where)} ORDER BY {', '.join(key)}"
+
+        next_key = None
+        if limit is not None:
+            # Walks the index up to the page's last row; nothing else is read
+            rows = self._reader().execute(f"SELECT {', '.join(key)} {query} LIMIT 2 OFFSET ?",
+                                          params + [limit - 1]).fetchall()
+            if len(rows) == 2:
+                next_key = list(rows[0])
+
+        def batches():
+            conn = self._connect()
+            try:
+                cursor = conn.execute(f"SELECT {', '.join(fields)} {query} LIMIT ?",
+                                      params + [-1 if limit is None else limit])
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                conn.close()
+
+        return next_key, batches()
+
+
+def _rollup(batch, width):
+    # Aggregates one batch per bucket before it hits the database
+    buckets = {}
+    for reading in batch:
+        bucket = int(reading[0] // width) * width
+        values = reading[1:1 + len(METRIC_FIELDS)]
+        agg = buckets.get(bucket)
+        if agg is None:
+            agg = buckets[bucket] = [0] + [v for value in values for v in (value, 0, value)]
+        agg[0] += 1
+        for i, value in enumerate(values):
+            base = 1 + 3 * i
+            if value < agg[base]:
+                agg[base] = value
+            agg[base + 1] += value
+            if value > agg[base + 2]:
+                agg[base + 2] = value
+    return [(bucket, *agg) for bucket, agg in buckets.items()]
+
+
+def _upsert_sql(name):
+    columns = ["bucket", "count"]
+    updates = ["count = count + excluded.count"]
+    for field in METRIC_FIELDS:
+        columns += [f"{field}_min", f"{field}_sum", f"{field}_max"]
+        updates += [
+            f"{field}_min = min({field}_min, excluded.{field}_min)",
+            f"{field}_sum = {field}_sum + excluded.{field}_sum",
+            f"{field}_max = max({field}_max, excluded.{field}_max)",
+        ]
+    return (
+        f"INSERT INTO rollup_{name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT(bucket) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+_INSERT_SQL = (
+    f"INSERT INTO readings (timestamp, {', '.join(METRIC_FIELDS)}, device) "
+    f"VALUES ({', '.join('?' * (len(METRIC_FIELDS) + 2))})"
+)
+_UPSERT_SQL = {name: _upsert_sql(name) for name in RESOLUTIONS}
@@ -1,21 +1,25 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context, url_for
 from flask_cors import CORS
-import serial
-import threading
 import time
-import pandas as pd
+import json
 import os
-import joblib
 import warnings
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
+from inventory_engine import (EXPORT_FORMATS, INVENTORY_COLUMNS, ModelPool, ModelPoolBusy, ModelPoolTimeout,
+                              ResponseCache, RestockQueue, RestockValidationError, StockAdjustmentError, StockLedger,
+                              build_recycling_steps, cached_response, decode_cursor, encode_cursor, get_engine,
+                              instrument_app, metrics_response, profiler_from_env, record_frames, stream_export)
+from inventory_engine.metrics import REGISTRY
+from inventory_engine.response_cache import exact, normalized
+from sensors import (AlertEngine, SensorBroadcaster, SensorRingBuffer, SensorStore, SerialIngestor,
+                     load_alert_rules, rows_to_dicts)
 
 app = Flask(__name__)
 CORS(app)
+# Request and template timings for /metrics; PROFILE_SLOW_REQUESTS=<seconds>
+# also samples the stacks of requests that run longer than that
+profiler = instrument_app(app, profiler=profiler_from_env())
 
-# Global variables for Arduino data
+# Global variables for Arduino data (shown until the first reading arrives)
 arduino_data = {
     'temperature': 0,
     'humidity': 0,
@@ -23,7 +27,16 @@ arduino_data = {
     'ldr_value': 0
 }
 arduino_connected = False
-serial_thread = None
+
+# Recent sensor readings from all boards, appended by the serial thread
+sensor_history = SensorRingBuffer()
+# Pushes each new reading to /arduino/stream clients
+sensor_broadcaster = SensorBroadcaster()
+# Persists readings and their per-minute/per-hour rollups across restarts
+sensor_store = SensorStore("sensor_history.db")
+sensor_store.start()
+# Environmental alarms, checked against every reading (rules: alert_rules.json or the defaults)
+alert_engine = AlertEngine(load_alert_rules())
 
 # Suppress warnings
 warnings.simplefilter("ignore")
@@ -34,278 +47,549 @@ demand_file = "textile_demand_dataset.csv"
 restock_file = "restock_requests.csv"
 fabric_waste_file = "Fabric_Waste_Data.csv"
 
+LOW_STOCK_THRESHOLD = 100
+MAX_RECYCLING_BATCH = 10000
+MAX_STOCK_MOVEMENTS = 100000
+DEFAULT_FORECAST_PAGE = 100
+MAX_FORECAST_PAGE = 10000
+DEFAULT_SEARCH_RESULTS = 10
+MAX_SEARCH_RESULTS = 100
+SEARCH_SOURCES = ('stock', 'demand', 'waste')
+
+# Recycling inference the model has not memoized runs here, off the request threads,
+# so a burst of recycling lookups cannot stall the sensor and stock endpoints
+model_pool = ModelPool()
+
+# Datasets, indexes and models are loaded once and shared with the other apps
 try:
-    stock_df = pd.read_csv(stock_file)
-    demand_df = pd.read_csv(demand_file)
-    fabric_data = pd.read_csv(fabric_waste_file)
+    engine = get_engine(stock_file=stock_file, demand_file=demand_file, waste_file=fabric_waste_file,
+                        low_stock_threshold=LOW_STOCK_THRESHOLD, model_pool=model_pool)
 except FileNotFoundError as e:
     print(f"Error loading dataset files: {e}")
     exit(1)
 
-# Clean column names
-stock_df.columns = stock_df.columns.str.strip()
-demand_df.columns = demand_df.columns.str.strip()
-fabric_data.columns = fabric_data.columns.str.strip()
+# Restock requests: validated against the stock catalog and group-committed to SQLite.
+# The old CSV is imported once when the database is first created.
+restock_queue = RestockQueue("restock_requests.db", engine, legacy_csv=restock_file)
 
-stock_df = stock_df.map(lambda x: x.strip() if isinstance(x, str) else x)
-demand_df = demand_df.map(lambda x: x.strip() if isinstance(x, str) else x)
-fabric_data = fabric_data.map(lambda x: x.strip() if isinstance(x, str) else x)
+# Receipts and dispatches: logged to SQLite, applied to the loaded stock table at once and
+# compacted into the stock CSV in the background. Logged movements the CSV does not have yet
+# are replayed here, after a crash or restart.
+stock_ledger = StockLedger("stock_ledger.db", engine)
+stock_ledger.start()
 
-# Convert 'Fabric Type' to lowercase
-stock_df["Fabric Type"] = stock_df["Fabric Type"].str.lower()
-demand_df["Fabric Type"] = demand_df["Fabric Type"].str.lower()
-fabric_data["Fabric"] = fabric_data["Fabric"].str.lower()
+# Serialized responses of the read-only lookups, keyed on their inputs and the data version
+response_cache = ResponseCache()
+
+# Rebuild the engine in the background when the CSVs or the model file change
+engine.on_reload(lambda snapshot: response_cache.clear())
+engine.start_watcher()
 
 # Define valid categories from dataset
 valid_seasons = ["Summer", "All-Season", "Winter", "Rainy"]
 valid_occasions = ["Casual", "Ethnic", "Formal", "Sportswear", "Workwear"]
 valid_budgets = ["Low", "Medium", "High"]
 
-# Encode categorical columns for fabric recycling
-label_encoder = LabelEncoder()
-fabric_data["Biodegradable"] = label_encoder.fit_transform(fabric_data["Biodegradable"])
-fabric_data["Recyclable"] = label_encoder.fit_transform(fabric_data["Recyclable"])
-fabric_data["Disposal Method"] = label_encoder.fit_transform(fabric_data["Disposal Method"])
-
-# Train Random Forest model
-X = fabric_data[["Biodegradable", "Recyclable", "Monthly_Waste_kg", "Annual_Trend"]]
-y = fabric_data["Disposal Method"]
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-rf_model.fit(X_train, y_train)
-
-# Save model
-joblib.dump(rf_model, "fabric_recycling_model.pkl")
-
-LOW_STOCK_THRESHOLD = 100
-
 def get_inventory_summary():
-    total_fabrics = stock_df['Fabric Type'].nunique()
-    current_inventory = stock_df['Stock Available'].sum()
-
-    # Identify low stock fabrics
-    low_stock_fabrics = stock_df[stock_df['Stock Available'] < LOW_STOCK_THRESHOLD]
-    low_stock_count = len(low_stock_fabrics)
-    low_stock_names = low_stock_fabrics['Fabric Type'].tolist()
-
-    # Identify high-demand fabrics
-    high_demand_fabrics = demand_df[demand_df['Current Demand'] > (demand_df['Historical Demand'] * 1.25)]
-    high_demand_count = len(high_demand_fabrics)
-    high_demand_names = high_demand_fabrics['Fabric Type'].tolist()
-
-    return {
-        'total_fabrics': total_fabrics,
-        'current_inventory': current_inventory,
-        'low_stock_count': low_stock_count,
-        'low_stock_names': low_stock_names,
-        'high_demand_count': high_demand_count,
-        'high_demand_names': high_demand_names
-    }
+    return engine.inventory_summary.snapshot()
 
+# Unknown names fall back to the closest fabric name, reported as matched_fabric
 def get_stock_details(fabric_type):
-    fabric_type = fabric_type.strip().lower()
-    stock_info = stock_df[stock_df["Fabric Type"] == fabric_type]
-    
-    if stock_info.empty:
-        return None
-    
-    return stock_info.iloc[0][["Price per Unit", "Stock Available", "Unit Type"]].to_dict()
+    return engine.stock_details(fabric_type, fuzzy=True)
 
 def predict_price(fabric_type):
-    df = demand_df[demand_df["Fabric Type"] == fabric_type]
-
-    if df.empty:
+    prediction = engine.predict_price(fabric_type, fuzzy=True)
+    if prediction is None:
         return None
-
-    X = df[['Historical Demand', 'Current Demand']]
-    y = df['Price per Unit']
-
-    model = LinearRegression()
-    model.fit(X, y)
-
-    predicted_price = model.predict(pd.DataFrame([X.iloc[0].values], columns=X.columns))[0]
-    
-    india_high_demand = {"cotton", "silk", "denim", "polyester"}
-    india_low_demand = {"wool", "linen", "rayon"}
-    
-    historical_demand = X.iloc[0, 0]
-    current_demand = X.iloc[0, 1]
-
-    if fabric_type in india_high_demand:
-        demand_status = "High Demand"
-    elif fabric_type in india_low_demand:
-        demand_status = "Low Demand"
-    else:
-        if current_demand > historical_demand * 1.25:
-            demand_status = "High Demand"
-        elif current_demand < historical_demand * 0.75:
-            demand_status = "Low Demand"
-        else:
-            demand_status = "Stable Demand"
     
     # Return consistent property names
-    return {
-        "predictedPrice": round(predicted_price, 2),
-        "demandStatus": demand_status
+    result = {
+        "predictedPrice": prediction["predicted_price"],
+        "demandStatus": prediction["demand_status"]
     }
+    if 'matched_fabric' in prediction:
+        result['matched_fabric'] = prediction['matched_fabric']
+    return result
+
+def search_fabrics(query, limit=DEFAULT_SEARCH_RESULTS, source=None):
+    return engine.search(query, limit, source)
 
 def recommend_fabrics(season, occasion, budget):
-    season = season.lower()
-    occasion = occasion.lower()
-    budget = budget.lower()
-    
-    filtered_df = demand_df[
-        (demand_df["Season"].str.lower() == season) &
-        (demand_df["Occasion"].str.lower() == occasion) &
-        (demand_df["Budget Category"].str.lower() == budget)
-    ]
-    
-    if filtered_df.empty:
-        filtered_df = demand_df[
-            (demand_df["Season"].str.lower() == "all-season") &
-            (demand_df["Occasion"].str.lower() == occasion) &
-            (demand_df["Budget Category"].str.lower() == budget)
-        ]
-    
-    return filtered_df["Fabric Type"].tolist() if not filtered_df.empty else ["No fabric recommendations available."]
+    # Falls back to all-season fabrics when nothing matches the season
+    return engine.recommend_fabrics(season, occasion, budget)
 
 def get_recycling_steps(fabric_name):
-    fabric_row = fabric_data[fabric_data["Fabric"].str.lower() == fabric_name.lower().strip()]
-    if fabric_row.empty:
-        return f"Sorry, recycling information for '{fabric_name}' is not available."
-    input_data = fabric_row[["Biodegradable", "Recyclable", "Monthly_Waste_kg", "Annual_Trend"]]
-    predicted_method = rf_model.predict(input_data)[0]
-    disposal_method = label_encoder.inverse_transform([predicted_method])[0]
-    steps = [f"Recycling Guide for {fabric_name}"]
-    steps.append("Step 1: Collect and separate clean fabric waste.")
-    if fabric_row["Biodegradable"].values[0] == 1:
-        steps.append("Step 2: If reusable, send for upcycling (convert into rags, bags, stuffing).")
-        if disposal_method == "Composting":
-            steps.append("Step 3: If not reusable, send for composting (fabric decomposes naturally).")
-        elif disposal_method == "Chemical Recycling":
-            steps.append("Step 3: Process through chemical recycling to extract reusable fibers.")
-    else:
-        if disposal_method == "Mechanical Recycling":
-            steps.append("Step 2: Shred and process the fabric into recycled fibers.")
-            steps.append("Step 3: Convert into new fabric materials for reuse.")
-        elif disposal_method == "Incineration":
-            steps.append("Step 2: If no recycling options are available, dispose of through incineration.")
-    return "\n".join(steps)
-
-def read_serial_data():
-    global arduino_data, arduino_connected
-    
-    # Replace with your actual Arduino port
-    arduino_port = 'COM3'
-    baud_rate = 9600
-    
-    try:
-        ser = serial.Serial(arduino_port, baud_rate, timeout=1)
-        arduino_connected = True
-        print(f"Connected to {arduino_port} at {baud_rate} baud rate.")
-        
-        while True:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8').strip()
-                print("Raw:", line)
-                
-                try:
-                    parts = line.split(',')
-                    if len(parts) >= 4:
-                        temperature = float(parts[0].split(':')[1].strip().replace('C', ''))
-                        humidity = float(parts[1].split(':')[1].strip().replace('%', ''))
-                        mq3_value = int(parts[2].split(':')[1].strip())
-                        ldr_value = int(parts[3].split(':')[1].strip())
-                        
-                        arduino_data = {
-                            'temperature': temperature,
-                            'humidity': humidity,
-                            'mq3_value': mq3_value,
-                            'ldr_value': ldr_value
-                        }
-                    
-                except (IndexError, ValueError) as e:
-                    print("Error parsing line:", e)
-                    
-            time.sleep(0.1)
-            
-    except serial.SerialException as e:
-        print("Error opening serial port:", e)
-        arduino_connected = False
-    except KeyboardInterrupt:
-        print("Serial reading stopped by user.")
-    finally:
-        if 'ser' in locals() and ser.is_open:
-            ser.close()
-            print("Serial port closed.")
-            arduino_connected = False
-
-# Start serial reading in a separate thread
+    return get_recycling_steps_batch([fabric_name])[0]['recycling_info']
+
+def get_recycling_steps_batch(items):
+    # items are fabric names or raw feature rows; the forest runs once per batch
+    results = []
+    for result in engine.classify_recycling(items, fuzzy=True):
+        if 'error' in result:
+            if isinstance(result['input'], str):
+                info = f"Sorry, recycling information for '{result['input']}' is not available."
+            else:
+                info = result['error']
+            results.append({'input': result['input'], 'error': result['error'], 'recycling_info': info})
+            continue
+        steps = build_recycling_steps(result['fabric'], result['biodegradable'], result['disposal_method'])
+        results.append({
+            'input': result['input'],
+            'disposal_method': result['disposal_method'],
+            'recycling_info': "\n".join(steps)
+        })
+        if 'matched_fabric' in result:
+            results[-1]['matched_fabric'] = result['matched_fabric']
+    return results
+
+def configured_ports():
+    # ARDUINO_PORTS lists the sensor boards, e.g. "COM3,COM4" or
+    # "dock=/dev/ttyUSB0,cutting=/dev/ttyUSB1" to name them
+    ports = {}
+    for entry in os.environ.get('ARDUINO_PORTS', 'COM3').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, port = entry.rpartition('=')
+        ports[name.strip() or port.strip()] = port.strip()
+    return ports
+
+def handle_reading(device, timestamp, temperature, humidity, mq3_value, ldr_value):
+    # Every board feeds the same history, store and stream
+    sensor_history.append(timestamp, temperature, humidity, mq3_value, ldr_value)
+    sensor_store.add(timestamp, temperature, humidity, mq3_value, ldr_value, device)
+    alert_engine.evaluate(device, timestamp, temperature, humidity, mq3_value, ldr_value)
+    publish_arduino_data(device)
+
+def log_alert(alert):
+    print(f"[{alert['severity'].upper()}] {alert['rule']} {alert['state']} on {alert['device']} "
+          f"({alert['metric']} = {alert['value']:.2f}, limit {alert['threshold']})")
+
+alert_engine.subscribe(log_alert)
+
+def handle_device_status(device, connected):
+    global arduino_connected
+    arduino_connected = serial_ingestor.connected
+    publish_arduino_data(device)
+
+def latest_arduino_data():
+    reading = sensor_history.latest()
+    return reading if reading is not None else arduino_data
+
+def publish_arduino_data(device=None):
+    sensor_broadcaster.publish(dict(latest_arduino_data(), connected=arduino_connected, device=device))
+
+# Reads all configured boards on one thread, reconnecting with backoff
+serial_ingestor = SerialIngestor(configured_ports(), handle_reading, handle_device_status)
+
+def collect_metrics():
+    # Serial ingest and cache counters, read when /metrics is scraped
+    devices = serial_ingestor.status()
+
+    def per_device(field):
+        return [({'device': device['device']}, int(device[field])) for device in devices]
+
+    return [
+        ('sensor_readings_total', 'counter', 'Readings parsed, per board.', per_device('readings')),
+        ('sensor_bad_frames_total', 'counter', 'Lines or frames that could not be parsed, per board.',
+         per_device('bad_lines')),
+        ('sensor_reconnects_total', 'counter', 'Reconnects after a board dropped out.', per_device('reconnects')),
+        ('sensor_failed_readings_total', 'counter', 'Readings lost because handling them raised, per board.',
+         per_device('failed_readings')),
+        ('sensor_connected', 'gauge', 'Whether the board is connected.', per_device('connected')),
+        ('sensor_active_alerts', 'gauge', 'Alerts currently raised.', [({}, len(alert_engine.active()))]),
+    ] + (sensor_store.metric_families() + response_cache.metric_families() + model_pool.metric_families()
+         + stock_ledger.metric_families())
+
+REGISTRY.register_collector(collect_metrics)
+
 def start_serial_thread():
-    global serial_thread
-    if serial_thread is None or not serial_thread.is_alive():
-        serial_thread = threading.Thread(target=read_serial_data)
-        serial_thread.daemon = True
-        serial_thread.start()
-        print("Serial thread started")
+    serial_ingestor.start()
+    print("Serial thread started")
 
 start_serial_thread()
 
 @app.route('/')
 def index():
     inventory = get_inventory_summary()
-    return render_template('index.html', inventory=inventory, arduino_connected=arduino_connected)
+    reorder = engine.reorder_suggestions(limit=10)
+    return render_template('index.html', inventory=inventory, reorder=reorder, arduino_connected=arduino_connected)
 
 @app.route('/arduino')
 def arduino_page():
     return render_template('arduino.html', 
                          arduino_connected=arduino_connected,
-                         initial_data=arduino_data)
+                         initial_data=latest_arduino_data())
 
 @app.route('/get_arduino_data')
 def get_arduino_data():
+    reading = latest_arduino_data()
     return jsonify({
-        'temperature': arduino_data['temperature'],
-        'humidity': arduino_data['humidity'],
-        'mq3_value': arduino_data['mq3_value'],
-        'ldr_value': arduino_data['ldr_value'],
+        'temperature': reading['temperature'],
+        'humidity': reading['humidity'],
+        'mq3_value': reading['mq3_value'],
+        'ldr_value': reading['ldr_value'],
         'connected': arduino_connected
     })
 
-@app.route('/check_stock', methods=['POST'])
+def alerts_payload(since=0, limit=None):
+    # Currently raised alerts plus raise/clear events after `since`
+    last_seq = alert_engine.last_seq
+    return {
+        'active': alert_engine.active(),
+        'events': alert_engine.recent(since, limit),
+        'last_seq': last_seq
+    }
+
+@app.route('/arduino/stream')
+def arduino_stream():
+    # Server-Sent Events: one message per new reading, an "alerts" event
+    # (the /alerts payload) whenever an alert is raised or cleared, and
+    # comments as keepalives
+    def events():
+        alerts = alerts_payload(limit=0)
+        yield f"event: alerts\ndata: {json.dumps(alerts)}\n\n"
+        yield f"data: {json.dumps(dict(latest_arduino_data(), connected=arduino_connected))}\n\n"
+        for message in sensor_broadcaster.subscribe():
+            # Rules are evaluated before a reading is published, so a
+            # transition goes out just ahead of the reading that caused it
+            if alert_engine.last_seq != alerts['last_seq']:
+                alerts = alerts_payload(alerts['last_seq'])
+                yield f"event: alerts\ndata: {json.dumps(alerts)}\n\n"
+            if message is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"data: {json.dumps(message)}\n\n"
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/arduino/history')
+def arduino_history():
+    # from/to are Unix timestamps (default: the last hour); resolution is raw, minute, hour or auto;
+    # device limits raw readings to one board
+    now = time.time()
+    end = request.args.get('to', now, type=float)
+    start = request.args.get('from', end - 3600, type=float)
+    resolution = request.args.get('resolution', 'auto')
+    try:
+        history = sensor_store.history(start, end, resolution, request.args.get('device'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    history.update({'from': start, 'to': end})
+    return jsonify(history)
+
+@app.route('/arduino/devices')
+def arduino_devices():
+    return jsonify({'devices': serial_ingestor.status(), 'connected': arduino_connected})
+
+@app.route('/alerts')
+def alerts():
+    # Currently raised alerts plus raise/clear events after ?since=<seq>
+    return jsonify(alerts_payload(request.args.get('since', 0, type=int), request.args.get('limit', type=int)))
+
+@app.route('/get_arduino_data/history')
+def get_arduino_history():
+    # Min/mean/max over the last `seconds`; add samples=1 to include the raw readings
+    seconds = request.args.get('seconds', 60, type=float)
+    history = sensor_history.stats(seconds)
+    if request.args.get('samples', 0, type=int):
+        history['samples'] = rows_to_dicts(sensor_history.window(seconds))
+    history['connected'] = arduino_connected
+    return jsonify(history)
+
+@app.route('/check_stock', methods=['GET', 'POST'])
+@cached_response(response_cache, engine.data_version, fabric_type=normalized)
 def check_stock():
-    fabric_type = request.form.get('fabric_type')
+    fabric_type = request.values.get('fabric_type')
     stock_details = get_stock_details(fabric_type)
     if stock_details is None:
         return jsonify({'error': 'Fabric not found'})
     return jsonify(stock_details)
 
-@app.route('/predict_price', methods=['POST'])
+@app.route('/predict_price', methods=['GET', 'POST'])
+@cached_response(response_cache, engine.data_version, fabric_type=normalized)
 def predict_price_route():
-    fabric_type = request.form.get('fabric_type')
+    fabric_type = request.values.get('fabric_type')
     predicted_info = predict_price(fabric_type)
     if predicted_info is None:
         return jsonify({'error': 'Fabric not found'})
     
     # Ensure we're returning the exact same property names
-    return jsonify({
+    response = {
         'predictedPrice': predicted_info['predictedPrice'],
         'demandStatus': predicted_info['demandStatus']
-    })
+    }
+    if 'matched_fabric' in predicted_info:
+        response['matched_fabric'] = predicted_info['matched_fabric']
+    return jsonify(response)
 
-@app.route('/recommend_fabrics', methods=['POST'])
+@app.route('/recommend_fabrics', methods=['GET', 'POST'])
+@cached_response(response_cache, engine.data_version, season=normalized, occasion=normalized, budget=normalized)
 def recommend_fabrics_route():
-    season = request.form.get('season')
-    occasion = request.form.get('occasion')
-    budget = request.form.get('budget')
+    season = request.values.get('season')
+    occasion = request.values.get('occasion')
+    budget = request.values.get('budget')
     recommendations = recommend_fabrics(season, occasion, budget)
-    return jsonify({'recommendations': recommendations})
+    response = {
+        'recommendations': recommendations,
+        'count': engine.recommendation_table.count(season, occasion, budget)
+    }
+    unknown = engine.recommendation_table.unknown_keys(season, occasion, budget)
+    if unknown:
+        response['unknown'] = unknown
+    return jsonify(response)
 
-@app.route('/get_recycling_info', methods=['POST'])
+@app.route('/get_recycling_info', methods=['GET', 'POST'])
+@cached_response(response_cache, engine.data_version, fabric_name=exact)
 def get_recycling_info():
-    fabric_name = request.form.get('fabric_name')
-    recycling_info = get_recycling_steps(fabric_name)
-    return jsonify({'recycling_info': recycling_info})
+    fabric_name = request.values.get('fabric_name')
+    if fabric_name is None or not fabric_name.strip():
+        return jsonify({'error': 'Fabric not found'})
+    try:
+        result = get_recycling_steps_batch([fabric_name])[0]
+    except ModelPoolBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(model_pool.retry_after)}
+    except ModelPoolTimeout as e:
+        return jsonify({'error': str(e)}), 504
+    response = {'recycling_info': result['recycling_info']}
+    if 'matched_fabric' in result:
+        response['matched_fabric'] = result['matched_fabric']
+    return jsonify(response)
+
+@app.route('/get_recycling_info/batch', methods=['POST'])
+def get_recycling_info_batch():
+    # Accepts {"items": [...]} JSON (fabric names or feature objects) or repeated fabric_name form fields
+    payload = request.get_json(silent=True)
+    if payload is not None:
+        items = payload.get('items', []) if isinstance(payload, dict) else payload
+    else:
+        items = request.form.getlist('fabric_name')
+    if not isinstance(items, list):
+        return jsonify({'error': 'items must be a list'}), 400
+    if len(items) > MAX_RECYCLING_BATCH:
+        return jsonify({'error': f'Batch too large (max {MAX_RECYCLING_BATCH} items)'}), 400
+    try:
+        results = get_recycling_steps_batch(items)
+    except ModelPoolBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(model_pool.retry_after)}
+    except ModelPoolTimeout as e:
+        return jsonify({'error': str(e)}), 504
+    return jsonify({'results': results})
+
+@app.route('/search')
+@cached_response(response_cache, engine.data_version, q=normalized, limit=exact, source=normalized)
+def search():
+    # Fabric names for ?q=: exact, completed (the last word is a prefix) or
+    # within a typo or two; ?source=stock|demand|waste keeps one dataset
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({'error': 'q is required'}), 400
+    limit = request.args.get('limit', DEFAULT_SEARCH_RESULTS, type=int)
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    source = request.args.get('source')
+    if source is not None:
+        source = source.strip().lower()
+        if source not in SEARCH_SOURCES:
+            return jsonify({'error': f"source must be one of {', '.join(SEARCH_SOURCES)}"}), 400
+    results = search_fabrics(query, min(limit, MAX_SEARCH_RESULTS), source)
+    # The normalized query, as cached: requests that differ only in case or spacing share the response
+    return jsonify({'query': normalized(query), 'results': results})
+
+def export_response(dataset, fmt, columns, next_key, frames):
+    # Streams the export as it is serialized; X-Next-Cursor and a Link header
+    # point at the next page when there is one
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    headers = {
+        'Content-Disposition': f'attachment; filename={dataset}.{extension}',
+        'X-Data-Version': engine.data_version(),
+        'Cache-Control': 'no-store'
+    }
+    if next_key is not None:
+        cursor = encode_cursor(next_key)
+        args = dict(request.args.items(), cursor=cursor)
+        headers['X-Next-Cursor'] = cursor
+        headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return Response(stream_with_context(stream_export(frames, fmt, columns, dataset)), mimetype=mimetype,
+                    headers=headers)
+
+def export_paging():
+    # (format, cursor key, limit) shared by the exports, or an error message
+    fmt = request.args.get('format', 'csv').strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return None, f"format must be one of {', '.join(EXPORT_FORMATS)}"
+    after = None
+    if request.args.get('cursor'):
+        try:
+            after = decode_cursor(request.args['cursor'])
+        except ValueError as e:
+            return None, str(e)
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return None, 'limit must be positive'
+    return (fmt, after, limit), None
+
+@app.route('/export/inventory')
+def export_inventory():
+    # Every stock row joined with its fabric's demand figures, predicted price and demand status, in ID
+    # order, as ?format=csv|ndjson (|arrow with pyarrow installed). Filters: fabric_type, prefix, unit_type,
+    # min_stock, max_stock, low_stock=1, demand_status. With ?limit= the X-Next-Cursor header carries the
+    # ?cursor= of the next page.
+    paging, error = export_paging()
+    if error:
+        return jsonify({'error': error}), 400
+    fmt, after, limit = paging
+    if after is not None and len(after) != 1:
+        return jsonify({'error': 'Malformed cursor'}), 400
+    next_key, frames = engine.export_inventory(
+        after, limit,
+        fabric_type=request.args.get('fabric_type'),
+        prefix=request.args.get('prefix'),
+        unit_type=request.args.get('unit_type'),
+        min_stock=request.args.get('min_stock', type=int),
+        max_stock=request.args.get('max_stock', type=int),
+        low_stock=request.args.get('low_stock', '').lower() in ('1', 'true', 'yes'),
+        demand_status=request.args.get('demand_status')
+    )
+    return export_response('inventory', fmt, INVENTORY_COLUMNS, next_key, frames)
+
+@app.route('/export/sensor_history')
+def export_sensor_history():
+    # Persisted readings (default: all of them) in time order, or per-minute/per-hour rollups with
+    # ?resolution=minute|hour; from/to, device, format, limit and cursor as for /export/inventory
+    paging, error = export_paging()
+    if error:
+        return jsonify({'error': error}), 400
+    fmt, after, limit = paging
+    resolution = request.args.get('resolution', 'raw')
+    device = request.args.get('device')
+    if device is not None and resolution != 'raw':
+        return jsonify({'error': 'device applies to raw readings only'}), 400
+    if after is not None and len(after) != (2 if resolution == 'raw' else 1):
+        return jsonify({'error': 'Malformed cursor'}), 400
+    start = request.args.get('from', 0, type=float)
+    end = request.args.get('to', time.time(), type=float)
+    try:
+        columns = sensor_store.export_columns(resolution)
+        next_key, batches = sensor_store.export(start, end, resolution, device, after, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return export_response('sensor_history', fmt, columns, next_key, record_frames(batches, columns))
+
+@app.route('/admin/reload', methods=['GET'])
+def reload_status():
+    return jsonify(engine.reload_status())
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_datasets():
+    # Rebuilds now instead of waiting for the file watcher; ?full=1 also
+    # rebuilds the parts whose files have not changed
+    full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
+    report = engine.reload(reason='manual', full=full)
+    return jsonify(report), 200 if report['ok'] else 500
+
+@app.route('/metrics')
+def metrics():
+    return metrics_response()
+
+@app.route('/debug/profiles')
+def debug_profiles():
+    # Recent slow-request profiles, newest first
+    if profiler is None:
+        return jsonify({'error': 'Profiling is off; set PROFILE_SLOW_REQUESTS=<seconds> to enable it'}), 404
+    return jsonify({'threshold': profiler.threshold, 'profiles': profiler.profiles()})
+
+@app.route('/debug/profiles/<int:profile_id>')
+def debug_profile(profile_id):
+    # Collapsed stacks, for flamegraph.pl or speedscope
+    collapsed = profiler.collapsed(profile_id) if profiler is not None else None
+    if collapsed is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return Response(collapsed, mimetype='text/plain')
+
+@app.route('/reorder_suggestions')
+def reorder_suggestions_route():
+    # Fabrics at or below their reorder point, least days of cover first;
+    # ?fabric_type= returns the plan for one fabric even when no order is due
+    fabric_type = request.args.get('fabric_type')
+    if fabric_type:
+        status = engine.reorder_status(fabric_type)
+        if status is None:
+            return jsonify({'error': 'Fabric not found'}), 404
+        return jsonify(status)
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    suggestions = engine.reorder_suggestions(limit)
+    return jsonify({'suggestions': suggestions, 'count': len(suggestions)})
+
+@app.route('/forecast')
+@cached_response(response_cache, engine.data_version, fabric_type=normalized, status=normalized, limit=exact,
+                 offset=exact)
+def forecast():
+    # Price and demand forecasts with 95% bands, computed for the whole catalog when the data loads.
+    # ?fabric_type= returns one fabric; otherwise ?status= (e.g. "High Demand"), ?limit= and ?offset= page the catalog
+    fabric_type = request.args.get('fabric_type')
+    if fabric_type:
+        result = engine.forecast(fabric_type)
+        if result is None:
+            return jsonify({'error': 'Fabric not found'}), 404
+        return jsonify(result)
+    limit = request.args.get('limit', DEFAULT_FORECAST_PAGE, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit < 0 or offset < 0:
+        return jsonify({'error': 'limit and offset must not be negative'}), 400
+    count, forecasts = engine.forecast_page(request.args.get('status'), min(limit, MAX_FORECAST_PAGE), offset)
+    return jsonify({'forecasts': forecasts, 'count': count, 'offset': offset})
+
+@app.route('/restock', methods=['POST'])
+def restock():
+    # Accepts one request as form fields or JSON, or {"requests": [...]} for a batch
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = request.form.to_dict()
+    batch = payload.get('requests') if isinstance(payload, dict) else payload
+    if batch is None:
+        batch = [payload]
+    if not isinstance(batch, list) or not all(isinstance(item, dict) for item in batch):
+        return jsonify({'error': 'Expected a restock request object or a list of them'}), 400
+    try:
+        ids = restock_queue.submit_many(batch)
+    except RestockValidationError as e:
+        return jsonify({'error': 'Invalid restock request', 'details': e.errors}), 400
+    except TimeoutError as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify({'ids': ids}), 201
+
+@app.route('/stock/adjust', methods=['POST'])
+def adjust_stock():
+    # {"movements": [{"fabric_type": "cotton", "delta": 40}, ...]} or a bare list; [fabric_type, delta] pairs
+    # work too. Positive deltas are receipts, negative ones dispatches. The batch is applied all or nothing.
+    payload = request.get_json(silent=True)
+    movements = payload.get('movements') if isinstance(payload, dict) else payload
+    if not isinstance(movements, list):
+        return jsonify({'error': 'Expected {"movements": [...]} or a list of movements'}), 400
+    if len(movements) > MAX_STOCK_MOVEMENTS:
+        return jsonify({'error': f'Batch too large (max {MAX_STOCK_MOVEMENTS} movements)'}), 400
+    try:
+        result = stock_ledger.adjust(movements)
+    except StockAdjustmentError as e:
+        return jsonify({'error': 'Invalid stock adjustment', 'details': e.errors}), 400
+    return jsonify(result)
+
+@app.route('/stock/adjust', methods=['GET'])
+def stock_ledger_status():
+    return jsonify(stock_ledger.status())
+
+@app.route('/restock', methods=['GET'])
+def restock_summary():
+    fabric_type = request.args.get('fabric_type')
+    if fabric_type:
+        return jsonify({
+            'totals': restock_queue.totals(fabric_type),
+            'requests': restock_queue.requests_for(fabric_type, request.args.get('limit', 100, type=int))
+        })
+    return jsonify({'totals': restock_queue.totals()})
 
 if __name__ == '__main__':
     app.run(debug=True, threaded=True)
\ No newline at end of file
@@ -0,0 +1,21 @@
+import argparse
+from inventory_engine.data_loader import load_waste
+from inventory_engine.recycling_model import MODEL_FILE, save_recycling_model, train_recycling_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the fabric recycling model and save it for the apps.")
+    parser.add_argument("--data", default="Fabric_Waste_Data.csv", help="waste dataset CSV")
+    parser.add_argument("--output", default=MODEL_FILE, help="where to write the model artifact")
+    args = parser.parse_args()
+
+    fabric_data = load_waste(args.data, cache_dir=None)
+
+    artifact = train_recycling_model(fabric_data)
+    save_recycling_model(artifact, args.output)
+    print(f"Trained model v{artifact['version']} in {artifact['train_seconds']:.2f}s "
+          f"(test accuracy {artifact['test_accuracy']:.3f}), saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()